@@ -1,7 +1,5 @@
-import asyncio
 from django.contrib import admin, messages
 from django.utils.html import format_html
-from django.utils import timezone
 from .models import (
     TelegramUser,
     Category,
@@ -12,12 +10,13 @@ from .models import (
     OrderItem,
     Broadcast,
 )
-from .utils import send_broadcast as send_broadcast_util
+from .services.broadcasts import queue_broadcast
 
 # раздел с клиентами Telegram
 @admin.register(TelegramUser)
 class TelegramUserAdmin(admin.ModelAdmin):
-    list_display = ('telegram_id', 'username', 'first_name', 'register_date')
+    list_display = ('telegram_id', 'username', 'first_name', 'register_date', 'delivery_status')
+    list_filter = ('delivery_status',)
     search_fields = ('telegram_id', 'username', 'first_name')
     ordering = ('-register_date',)
 
@@ -46,14 +45,19 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ('subcategory__category', 'subcategory')
     search_fields = ('id', 'description')
     readonly_fields = ('created_at', 'image_thumbnail')
+    exclude = ('image_file_id', 'image_file_id_source')
 
     def image_preview(self, obj):
+        if obj.has_image_derivatives and obj.image_thumb:
+            return format_html('<img src="{}" width="50" height="50" />', obj.image_thumb.url)
         if obj.image:
             return format_html('<img src="{}" width="50" height="50" />', obj.image.url)
         return "Нет изображения"
     image_preview.short_description = 'Превью'
 
     def image_thumbnail(self, obj):
+        if obj.has_image_derivatives and obj.image_telegram:
+            return format_html('<img src="{}" width="150" />', obj.image_telegram.url)
         if obj.image:
             return format_html('<img src="{}" width="150" />', obj.image.url)
         return "Нет изображения"
@@ -68,57 +72,51 @@ class OrderItemInline(admin.TabularInline):
 # раздел с заказами
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'full_name', 'phone_number', 'address', 'is_paid', 'created_at')
-    list_filter = ('is_paid',)
-    search_fields = ('user__telegram_id', 'full_name', 'phone_number', 'address')
-    readonly_fields = ('created_at',)
+    list_display = ('id', 'user', 'full_name', 'phone_number', 'address', 'is_paid', 'payment_status', 'created_at')
+    list_filter = ('is_paid', 'payment_status')
+    search_fields = ('user__telegram_id', 'full_name', 'phone_number', 'address', 'payment_id')
+    readonly_fields = ('created_at', 'payment_id', 'payment_status')
     inlines = [OrderItemInline]
 
 
 # раздел с рассылками
 @admin.register(Broadcast)
 class BroadcastAdmin(admin.ModelAdmin):
-    list_display = ('title', 'created_at', 'sent', 'sent_at')
+    list_display = ('title', 'created_at', 'sent', 'sent_at', 'delivery_progress')
     list_filter = ('sent',)
     search_fields = ('title', 'message')
     ordering = ('-created_at',)
-    readonly_fields = ('created_at', 'sent_at')
+    readonly_fields = ('created_at', 'queued_at', 'sent_at', 'delivery_progress')
     actions = ['send_broadcast_action']
 
-    def send_broadcast_action(self, request, queryset):
-        user_ids = list(TelegramUser.objects.values_list('telegram_id', flat=True))
-        if not user_ids:
-            self.message_user(request, "Нет пользователей для отправки рассылки.", messages.WARNING)
-            return
+    # прогресс берется из счетчиков рассылки, строки доставок не читаются
+    def delivery_progress(self, obj):
+        if obj.queued_at is None:
+            return "не отправлялась"
+        done = obj.sent_count + obj.failed_count
+        return f"{done} из {obj.recipients_count} (доставлено {obj.sent_count}, ошибок {obj.failed_count})"
+    delivery_progress.short_description = "Прогресс"
 
-        num_sent = 0
-        for broadcast_obj in queryset.filter(sent=False):
+    # рассылки ставятся в очередь, отправляет их отдельный процесс run_broadcasts
+    def send_broadcast_action(self, request, queryset):
+        num_queued = 0
+        for broadcast_obj in queryset.filter(sent=False, queued_at__isnull=True):
             try:
-                success_count, failed_ids = asyncio.run(
-                    send_broadcast_util(user_ids, broadcast_obj.title, broadcast_obj.message)
+                recipients = queue_broadcast(broadcast_obj.id)
+                num_queued += 1
+                self.message_user(
+                    request,
+                    f"Рассылка '{broadcast_obj.title}' поставлена в очередь: {recipients} получателей.",
+                    messages.SUCCESS
                 )
-
-                broadcast_obj.sent = True
-                broadcast_obj.sent_at = timezone.now()
-                broadcast_obj.save()
-
-                num_sent += 1
-
-                message = f"Рассылка '{broadcast_obj.title}' отправлена {success_count} пользователям."
-                if failed_ids:
-                    message += f" Не удалось отправить {len(failed_ids)} пользователям."
-
-                level = messages.SUCCESS if not failed_ids else messages.WARNING
-                self.message_user(request, message, level)
-
             except Exception as e:
                 self.message_user(
                     request,
-                    f"Ошибка при отправке рассылки '{broadcast_obj.title}': {str(e)}",
+                    f"Ошибка при постановке рассылки '{broadcast_obj.title}' в очередь: {str(e)}",
                     messages.ERROR
                 )
 
-        if num_sent == 0:
+        if num_queued == 0:
             self.message_user(
                 request,
                 "Не выбрано новых рассылок для отправки или все уже были отправлены.",
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+# telegram допускает около 30 сообщений в секунду от бота разным пользователям
+BROADCAST_RATE = float(os.getenv('BROADCAST_RATE', '25'))
+BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', '20'))
+# сколько раз повторять сообщение одному пользователю после 429
+MAX_RETRY_AFTER_ATTEMPTS = 3
+
+
+# общий для всей рассылки token bucket с адаптивной скоростью:
+# после 429 все отправители ждут retry_after, а скорость снижается; без ошибок она постепенно восстанавливается
+class AdaptiveRateLimiter:
+    def __init__(self, rate: float, min_rate: float = 1.0, recover_after: float = 10.0):
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.rate = rate
+        self.recover_after = recover_after
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._last_penalty = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._recover(now)
+                self._tokens = min(1.0, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+    # ответ 429: пауза для всех отправителей и снижение скорости
+    def penalize(self, retry_after: float):
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + retry_after)
+        self._last_penalty = now
+        self.rate = max(self.min_rate, self.rate * 0.7)
+        self._tokens = 0.0
+        logger.warning(f"Telegram просит подождать {retry_after} с, скорость рассылки снижена до {self.rate:.1f}/с")
+
+    def _recover(self, now):
+        if self.rate < self.max_rate and now - self._last_penalty > self.recover_after:
+            self.rate = min(self.max_rate, self.rate * 1.2)
+            self._last_penalty = now
+
+
+@dataclass
+class BroadcastStats:
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def throughput(self) -> float:
+        return (self.sent + self.failed) / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f"отправлено {self.sent}, ошибок {self.failed}, повторов после 429 {self.retried}, "
+                f"{self.throughput:.1f} сообщ./с за {self.elapsed:.0f} с")
+
+
+def format_broadcast(title: str, message: str) -> str:
+    return f"<b>{title}</b>\n\n{message}"
+
+
+async def _deliver(bot, limiter, stats, chat_id, text):
+    for _ in range(MAX_RETRY_AFTER_ATTEMPTS + 1):
+        await limiter.acquire()
+        try:
+            await bot.send_message(chat_id=chat_id, text=text)
+            return None
+        except TelegramRetryAfter as e:
+            stats.retried += 1
+            limiter.penalize(e.retry_after)
+            error = e
+        except TelegramAPIError as e:
+            return e
+    return error
+
+
+# рассылка текста получателям (список или асинхронный поток chat id)
+# с ограниченным числом одновременных запросов и общим лимитом скорости
+# on_result(chat_id, error) вызывается после каждой попытки доставки (error None - доставлено)
+# общий limiter позволяет сохранять снижение скорости между несколькими вызовами
+async def run_broadcast(
+    bot: Bot,
+    chat_ids,
+    text: str,
+    rate: float = BROADCAST_RATE,
+    concurrency: int = BROADCAST_CONCURRENCY,
+    on_result=None,
+    progress_interval: float = 10.0,
+    limiter: AdaptiveRateLimiter = None,
+) -> BroadcastStats:
+    limiter = limiter or AdaptiveRateLimiter(rate)
+    stats = BroadcastStats()
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def worker():
+        while True:
+            chat_id = await queue.get()
+            try:
+                if chat_id is None:
+                    return
+                error = await _deliver(bot, limiter, stats, chat_id, text)
+                if error is None:
+                    stats.sent += 1
+                else:
+                    stats.failed += 1
+                if on_result is not None:
+                    await on_result(chat_id, error)
+            except Exception as e:
+                logger.error(f"Ошибка рассылки пользователю {chat_id}: {e}")
+            finally:
+                queue.task_done()
+
+    async def report_progress():
+        while True:
+            await asyncio.sleep(progress_interval)
+            logger.info(f"Рассылка: {stats}")
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    progress = asyncio.create_task(report_progress())
+    try:
+        # получатели читаются по мере освобождения места в очереди, поэтому могут приходить потоком
+        if hasattr(chat_ids, '__aiter__'):
+            async for chat_id in chat_ids:
+                await queue.put(chat_id)
+        else:
+            for chat_id in chat_ids:
+                await queue.put(chat_id)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        progress.cancel()
+        for task in workers:
+            task.cancel()
+
+    logger.info(f"Рассылка завершена: {stats}")
+    return stats
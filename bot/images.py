@@ -0,0 +1,119 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# ограничения для фото, отправляемых в Telegram
+TELEGRAM_MAX_SIDE = 1280
+TELEGRAM_MAX_BYTES = 1024 * 1024
+TELEGRAM_QUALITIES = (85, 75, 65, 55, 45)
+
+# превью для списка товаров в админке
+THUMB_SIZE = (100, 100)
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('IMAGE_WORKERS', '2')),
+    thread_name_prefix='image-derivatives'
+)
+
+
+# приведение к RGB: jpeg не поддерживает прозрачность и палитры
+def _to_rgb(image):
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+# jpeg для Telegram: сторона не больше TELEGRAM_MAX_SIDE, размер не больше TELEGRAM_MAX_BYTES
+def render_telegram_image(image):
+    image = image.copy()
+    image.thumbnail((TELEGRAM_MAX_SIDE, TELEGRAM_MAX_SIDE), Image.LANCZOS)
+    data = b''
+    for quality in TELEGRAM_QUALITIES:
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+        data = buffer.getvalue()
+        if len(data) <= TELEGRAM_MAX_BYTES:
+            break
+    return data
+
+
+# квадратное превью для админки
+def render_thumbnail(image):
+    thumb = ImageOps.fit(image, THUMB_SIZE, Image.LANCZOS)
+    buffer = io.BytesIO()
+    thumb.save(buffer, format='JPEG', quality=80, optimize=True)
+    return buffer.getvalue()
+
+
+# генерация производных изображений товара
+# сохраняет их только если за время обработки исходное фото не поменяли
+def generate_product_derivatives(product_id):
+    from .models import Product
+
+    product = Product.objects.filter(id=product_id).first()
+    if product is None or not product.image:
+        return
+    source_name = product.image.name
+    if product.image_derivatives_source == source_name:
+        return
+
+    with product.image.open('rb') as source:
+        with Image.open(source) as original:
+            image = _to_rgb(ImageOps.exif_transpose(original))
+            telegram_data = render_telegram_image(image)
+            thumb_data = render_thumbnail(image)
+
+    base_name = os.path.splitext(os.path.basename(source_name))[0]
+    old_files = [product.image_telegram, product.image_thumb]
+    telegram_field = product.image_telegram.field
+    thumb_field = product.image_thumb.field
+    telegram_name = telegram_field.storage.save(
+        telegram_field.generate_filename(product, f"{base_name}.jpg"),
+        ContentFile(telegram_data)
+    )
+    thumb_name = thumb_field.storage.save(
+        thumb_field.generate_filename(product, f"{base_name}.jpg"),
+        ContentFile(thumb_data)
+    )
+
+    updated = Product.objects.filter(id=product_id, image=source_name).update(
+        image_telegram=telegram_name,
+        image_thumb=thumb_name,
+        image_derivatives_source=source_name
+    )
+    if not updated:
+        old_files = []
+        telegram_field.storage.delete(telegram_name)
+        thumb_field.storage.delete(thumb_name)
+
+    for old_file in old_files:
+        if old_file:
+            old_file.storage.delete(old_file.name)
+
+
+# обработка в потоке пула со своим соединением к базе
+def _generate_in_worker(product_id):
+    close_old_connections()
+    try:
+        generate_product_derivatives(product_id)
+    except Exception as e:
+        logger.error(f"Ошибка обработки фото товара {product_id}: {e}")
+    finally:
+        close_old_connections()
+
+
+# постановка обработки в пул, чтобы не задерживать запрос админки
+def schedule_product_derivatives(product_id):
+    return _executor.submit(_generate_in_worker, product_id)
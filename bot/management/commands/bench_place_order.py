@@ -0,0 +1,73 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from bot.models import CartItem, Category, Order, OrderItem, Product, Subcategory, TelegramUser
+from bot.services.orders import place_order
+
+
+class _Rollback(Exception):
+    pass
+
+
+# старый вариант оформления: заказ, позиции по одной и удаление корзины, без транзакции
+def _place_order_per_line(user):
+    order = Order.objects.create(user=user, full_name="Бенчмарк", phone_number="+70000000000", address="бенчмарк")
+    for item in CartItem.objects.filter(user=user).select_related('product'):
+        OrderItem.objects.create(order=order, product=item.product, quantity=item.quantity)
+    CartItem.objects.filter(user=user).delete()
+    return order
+
+
+# замер оформления заказа в зависимости от размера корзины
+# все тестовые данные создаются в транзакции, которая в конце откатывается
+class Command(BaseCommand):
+    help = "Замеряет время и число запросов оформления заказа для корзин разного размера"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50, 200])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        sizes = options['sizes']
+        repeat = options['repeat']
+        try:
+            with transaction.atomic():
+                self._run(sizes, repeat)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, sizes, repeat):
+        tag = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name=f"bench-{tag}")
+        subcategory = Subcategory.objects.create(category=category, name=f"bench-{tag}")
+        products = Product.objects.bulk_create(
+            Product(subcategory=subcategory, description=f"Тестовый товар {i}")
+            for i in range(max(sizes))
+        )
+        user = TelegramUser.objects.create(telegram_id=-int(uuid.uuid4().int % 10 ** 12), username=f"bench-{tag}")
+
+        self.stdout.write(f"{'позиций':>8} {'place_order, мс':>16} {'запросов':>9} {'по одной, мс':>14} {'запросов':>9}")
+        for size in sizes:
+            fast = self._measure(user, products[:size], repeat, lambda: place_order(
+                user.id, "Бенчмарк", "+70000000000", "бенчмарк"
+            ))
+            slow = self._measure(user, products[:size], repeat, lambda: _place_order_per_line(user))
+            self.stdout.write(f"{size:>8} {fast[0]:>16.2f} {fast[1]:>9} {slow[0]:>14.2f} {slow[1]:>9}")
+
+    def _measure(self, user, products, repeat, place):
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            CartItem.objects.bulk_create(CartItem(user=user, product=product, quantity=2) for product in products)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                place()
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = len(captured)
+        timings.sort()
+        return timings[len(timings) // 2], queries
@@ -0,0 +1,144 @@
+import asyncio
+import random
+import uuid
+
+import aiohttp
+from aiohttp import web
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+# локальная замена API ЮKassa для разработки и нагрузочных тестов оформления заказа
+# хранит платежи в памяти, поддерживает Idempotence-Key, подтверждение по ссылке и уведомления
+class FakeYooKassa:
+    def __init__(self, base_url, latency=0.0, error_rate=0.0, auto_succeed=None, notify_url=None):
+        self.base_url = base_url.rstrip('/')
+        self.latency = latency
+        self.error_rate = error_rate
+        self.auto_succeed = auto_succeed
+        self.notify_url = notify_url
+        self.payments = {}
+        self.by_key = {}
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post('/v3/payments', self.create_payment)
+        app.router.add_get('/v3/payments', self.list_payments)
+        app.router.add_get('/v3/payments/{payment_id}', self.get_payment)
+        app.router.add_get('/confirm/{payment_id}', self.confirm)
+        if self.auto_succeed is not None:
+            app.on_startup.append(self._start_auto_succeed)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        if request.path.startswith('/v3/'):
+            if 'Authorization' not in request.headers:
+                return web.json_response({'type': 'error', 'code': 'invalid_credentials'}, status=401)
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.error_rate and random.random() < self.error_rate:
+                return web.json_response({'type': 'error', 'code': 'internal_server_error'}, status=503)
+        return await handler(request)
+
+    async def create_payment(self, request):
+        key = request.headers.get('Idempotence-Key')
+        if not key:
+            return web.json_response({'type': 'error', 'code': 'invalid_request',
+                                      'description': 'Idempotence-Key is required'}, status=400)
+        if key in self.by_key:
+            return web.json_response(self.payments[self.by_key[key]])
+
+        body = await request.json()
+        payment_id = str(uuid.uuid4())
+        self.payments[payment_id] = {
+            'id': payment_id,
+            'status': 'pending',
+            'paid': False,
+            'amount': body.get('amount'),
+            'description': body.get('description'),
+            'metadata': body.get('metadata') or {},
+            'created_at': timezone.now().isoformat(),
+            'confirmation': {
+                'type': 'redirect',
+                'confirmation_url': f"{self.base_url}/confirm/{payment_id}",
+            },
+        }
+        self.by_key[key] = payment_id
+        return web.json_response(self.payments[payment_id])
+
+    async def get_payment(self, request):
+        payment = self.payments.get(request.match_info['payment_id'])
+        if payment is None:
+            return web.json_response({'type': 'error', 'code': 'not_found'}, status=404)
+        return web.json_response(payment)
+
+    # список платежей с фильтром по статусу и постраничным курсором, как в API
+    async def list_payments(self, request):
+        status = request.query.get('status')
+        limit = min(int(request.query.get('limit', 10)), 100)
+        start = int(request.query.get('cursor', 0))
+        items = [p for p in self.payments.values() if status is None or p['status'] == status]
+        page = items[start:start + limit]
+        response = {'type': 'list', 'items': page}
+        if start + limit < len(items):
+            response['next_cursor'] = str(start + limit)
+        return web.json_response(response)
+
+    # страница оплаты: переход по ссылке сразу проводит платеж
+    async def confirm(self, request):
+        payment = self.payments.get(request.match_info['payment_id'])
+        if payment is None:
+            raise web.HTTPNotFound()
+        await self._succeed(payment)
+        return web.Response(text=f"Платеж {payment['id']} оплачен")
+
+    async def _succeed(self, payment):
+        if payment['status'] != 'pending':
+            return
+        payment['status'] = 'succeeded'
+        payment['paid'] = True
+        if self.notify_url:
+            asyncio.create_task(self._notify(payment))
+
+    async def _notify(self, payment):
+        notification = {'type': 'notification', 'event': f"payment.{payment['status']}", 'object': payment}
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(self.notify_url, json=notification) as response:
+                    await response.read()
+        except aiohttp.ClientError as e:
+            print(f"Уведомление о платеже {payment['id']} не доставлено: {e}")
+
+    async def _start_auto_succeed(self, app):
+        app['auto_succeed'] = asyncio.create_task(self._auto_succeed_loop())
+
+    async def _auto_succeed_loop(self):
+        while True:
+            await asyncio.sleep(self.auto_succeed)
+            for payment in list(self.payments.values()):
+                await self._succeed(payment)
+
+
+class Command(BaseCommand):
+    help = "Запускает локальный сервер, имитирующий API ЮKassa (YOOKASSA_API_URL=http://host:port/v3)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8090)
+        parser.add_argument('--latency', type=float, default=0.0, help="задержка ответа API, секунды")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="доля ответов 503 для проверки повторов")
+        parser.add_argument('--auto-succeed', type=float, default=None,
+                            help="проводить ожидающие платежи каждые N секунд")
+        parser.add_argument('--notify-url', default=None, help="адрес для уведомлений о статусе платежа")
+
+    def handle(self, *args, **options):
+        fake = FakeYooKassa(
+            base_url=f"http://{options['host']}:{options['port']}",
+            latency=options['latency'],
+            error_rate=options['error_rate'],
+            auto_succeed=options['auto_succeed'],
+            notify_url=options['notify_url'],
+        )
+        self.stdout.write(f"API: http://{options['host']}:{options['port']}/v3")
+        web.run_app(fake.app(), host=options['host'], port=options['port'], print=None)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from bot.images import generate_product_derivatives
+from bot.models import Product
+
+
+# генерация фото для Telegram и превью для уже загруженных товаров
+class Command(BaseCommand):
+    help = "Генерирует оптимизированные фото для Telegram и превью для админки"
+
+    def handle(self, *args, **options):
+        product_ids = (
+            Product.objects.exclude(image='').exclude(image__isnull=True)
+            .values_list('id', flat=True)
+            .iterator(chunk_size=500)
+        )
+        count = 0
+        for product_id in product_ids:
+            try:
+                generate_product_derivatives(product_id)
+                count += 1
+            except Exception as e:
+                self.stderr.write(f"Товар {product_id}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Обработано товаров: {count}"))
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bot.models import Order
+from bot.services.orders import aapply_payment_statuses, aattach_payments
+from bot.services.payments import PaymentError, create_gateway
+from bot.telegram import close_shared_bot
+from bot.utils import notify_orders_paid
+
+
+# сверка неоплаченных заказов с ЮKassa на случай потерянных уведомлений
+# статусы всех платежей за окно читаются постранично списком, а изменения применяются одним UPDATE
+# заказы без payment_id (ответ на создание платежа не дошел до бота) находятся по order_id в metadata платежа
+class Command(BaseCommand):
+    help = "Сверяет статусы неоплаченных заказов с ЮKassa"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=3, help="за сколько дней проверять заказы")
+        parser.add_argument('--interval', type=int, default=0,
+                            help="повторять сверку каждые N секунд (0 - один раз)")
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options['days'], options['interval']))
+
+    async def _run(self, days, interval):
+        gateway = create_gateway()
+        try:
+            while True:
+                try:
+                    await self._reconcile(gateway, days)
+                except PaymentError as e:
+                    self.stderr.write(f"Ошибка сверки платежей: {e}")
+                if not interval:
+                    return
+                await asyncio.sleep(interval)
+        finally:
+            await gateway.close()
+            await close_shared_bot()
+
+    async def _reconcile(self, gateway, days):
+        started = time.perf_counter()
+        since = timezone.now() - timedelta(days=days)
+        pending = {}
+        without_payment = set()
+        async for order_id, payment_id, status in Order.objects.filter(
+            is_paid=False, created_at__gte=since
+        ).values_list('id', 'payment_id', 'payment_status'):
+            if payment_id is None:
+                without_payment.add(order_id)
+            else:
+                pending[payment_id] = status
+        if not pending and not without_payment:
+            return
+
+        changed = {}
+        found = {}
+        found_statuses = {}
+        async for payment in gateway.list_payments(created_after=since):
+            if payment.id in pending:
+                if pending[payment.id] != payment.status:
+                    changed[payment.id] = payment.status
+                continue
+            order_id = _order_id(payment.metadata)
+            if order_id in without_payment:
+                found[order_id] = payment.id
+                found_statuses[payment.id] = payment.status
+
+        attached = await aattach_payments(found)
+        for payment_id in attached:
+            changed[payment_id] = found_statuses[payment_id]
+
+        paid = await aapply_payment_statuses(changed)
+        await notify_orders_paid(paid)
+        self.stdout.write(
+            f"Неоплаченных заказов: {len(pending) + len(without_payment)}, найдено платежей: {len(attached)}, "
+            f"изменилось: {len(changed)}, оплачено: {len(paid)} ({time.perf_counter() - started:.1f} с)"
+        )
+
+
+def _order_id(metadata):
+    try:
+        return int(metadata.get('order_id'))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+
+from bot.broadcast import AdaptiveRateLimiter, BROADCAST_RATE, format_broadcast, run_broadcast
+from bot.models import Broadcast, BroadcastDelivery
+from bot.services.broadcasts import (
+    claim_deliveries, finish_broadcasts, next_pending_broadcast, release_stale_deliveries, save_delivery_results,
+)
+from bot.services.users import amark_users_unreachable, unreachable_status
+from bot.telegram import close_shared_bot
+from bot.utils import get_bot
+
+logger = logging.getLogger(__name__)
+
+# доставки в статусе "отправляется" дольше этого времени считаются брошенными упавшим процессом
+STALE_AFTER = timedelta(minutes=15)
+
+
+# обработчик очереди рассылок: забирает пачки доставок через FOR UPDATE SKIP LOCKED,
+# поэтому можно запустить несколько процессов, а после перезапуска работа продолжится с места остановки
+# в памяти процесса не больше одной пачки получателей и одной порции результатов
+class Command(BaseCommand):
+    help = "Отправляет рассылки, поставленные в очередь из админки"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=500, help="доставок в одной пачке")
+        parser.add_argument('--poll', type=float, default=5.0, help="пауза при пустой очереди, секунды")
+        parser.add_argument('--once', action='store_true', help="выйти, когда очередь опустеет")
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options['batch'], options['poll'], options['once']))
+
+    async def _run(self, batch, poll, once):
+        bot = await get_bot()
+        if not bot:
+            raise CommandError("TELEGRAM_TOKEN не найден в .env")
+
+        limiter = AdaptiveRateLimiter(BROADCAST_RATE)
+        try:
+            while True:
+                broadcast_id = await sync_to_async(next_pending_broadcast)()
+                if broadcast_id is not None:
+                    await self._send_broadcast(bot, limiter, broadcast_id, batch)
+                for finished_id in await sync_to_async(finish_broadcasts)():
+                    self.stdout.write(f"Рассылка #{finished_id} завершена")
+                if broadcast_id is not None:
+                    continue
+
+                released = await sync_to_async(release_stale_deliveries)(STALE_AFTER)
+                if released:
+                    logger.warning(f"Возвращено в очередь брошенных доставок: {released}")
+                    continue
+                if once:
+                    return
+                await asyncio.sleep(poll)
+        finally:
+            await close_shared_bot()
+
+    # получатели забираются пачками по мере отправки, результаты записываются порциями
+    async def _send_broadcast(self, bot, limiter, broadcast_id, batch):
+        broadcast = await Broadcast.objects.aget(id=broadcast_id)
+        sink = DeliveryResultSink(broadcast_id, flush_size=batch)
+
+        async def claimed_recipients():
+            while True:
+                chunk = await sync_to_async(claim_deliveries)(broadcast_id, batch)
+                for telegram_id in chunk:
+                    yield telegram_id
+                if len(chunk) < batch:
+                    return
+
+        try:
+            stats = await run_broadcast(
+                bot,
+                claimed_recipients(),
+                format_broadcast(broadcast.title, broadcast.message),
+                on_result=sink.add,
+                limiter=limiter,
+            )
+        finally:
+            await sink.flush()
+        self.stdout.write(f"Рассылка #{broadcast_id}: {stats}")
+
+
+# буфер результатов доставки: сбрасывается в базу одним UPDATE по размеру или по времени
+class DeliveryResultSink:
+    def __init__(self, broadcast_id: int, flush_size: int = 500, flush_interval: float = 5.0):
+        self.broadcast_id = broadcast_id
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._results = []
+        self._unreachable = {}
+        self._flushed = time.monotonic()
+
+    async def add(self, telegram_id, error):
+        if error is None:
+            self._results.append((telegram_id, BroadcastDelivery.SENT, ''))
+        else:
+            self._results.append((telegram_id, BroadcastDelivery.FAILED, str(error)[:255]))
+            # заблокировавшие бота и удаленные пользователи исключаются из следующих рассылок
+            status = unreachable_status(error)
+            if status is not None:
+                self._unreachable[telegram_id] = status
+        if len(self._results) >= self.flush_size or time.monotonic() - self._flushed > self.flush_interval:
+            await self.flush()
+
+    async def flush(self):
+        results, self._results = self._results, []
+        unreachable, self._unreachable = self._unreachable, {}
+        self._flushed = time.monotonic()
+        await sync_to_async(save_delivery_results)(self.broadcast_id, results)
+        await amark_users_unreachable(unreachable)
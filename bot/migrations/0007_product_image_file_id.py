@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0006_remove_product_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_file_id',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Telegram file_id фото'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='image_file_id_source',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Версия фото для file_id'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0007_product_image_file_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['subcategory', '-created_at', '-id'], name='product_sub_created_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0008_product_sub_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_telegram',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='products/telegram/%Y/%m/%d/', verbose_name='Фото для Telegram'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='image_thumb',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='products/thumbs/%Y/%m/%d/', verbose_name='Превью фото'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='image_derivatives_source',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Исходное фото производных'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:30
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0009_product_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE bot_product AS p
+                SET search_vector =
+                    setweight(to_tsvector('russian', coalesce(p.description, '')), 'A') ||
+                    setweight(to_tsvector('russian', s.name), 'B') ||
+                    setweight(to_tsvector('russian', c.name), 'C')
+                FROM bot_subcategory AS s
+                JOIN bot_category AS c ON c.id = s.category_id
+                WHERE p.subcategory_id = s.id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0010_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FSMRecord',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('state', models.CharField(blank=True, max_length=255, null=True, verbose_name='Состояние')),
+                ('data', models.JSONField(default=dict, verbose_name='Данные')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Состояние FSM',
+                'verbose_name_plural': 'Состояния FSM',
+            },
+        ),
+    ]
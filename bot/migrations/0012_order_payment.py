@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0011_fsmrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='payment_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='ID платежа ЮKassa'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='payment_status',
+            field=models.CharField(default='pending', max_length=32, verbose_name='Статус платежа'),
+        ),
+        # заказы, отмеченные оплаченными сразу при создании платежа, считаем проведенными
+        migrations.RunSQL(
+            sql="UPDATE bot_order SET payment_status = 'succeeded' WHERE is_paid",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['created_at'], name='order_unpaid_idx'),
+        ),
+    ]
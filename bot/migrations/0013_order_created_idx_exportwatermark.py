@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0012_order_payment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='order_created_idx'),
+        ),
+        migrations.CreateModel(
+            name='ExportWatermark',
+            fields=[
+                ('admin_id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='Telegram ID администратора')),
+                ('exported_until', models.DateTimeField(verbose_name='Заказы выгружены до')),
+            ],
+            options={
+                'verbose_name': 'Отметка выгрузки',
+                'verbose_name_plural': 'Отметки выгрузок',
+            },
+        ),
+    ]
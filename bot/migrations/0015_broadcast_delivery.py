@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0014_order_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='broadcast',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Поставлена в очередь'),
+        ),
+        migrations.CreateModel(
+            name='BroadcastDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('telegram_id', models.BigIntegerField(verbose_name='Telegram ID')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает'), ('sending', 'Отправляется'), ('sent', 'Доставлено'), ('failed', 'Ошибка')], default='pending', max_length=16, verbose_name='Статус')),
+                ('error', models.CharField(blank=True, max_length=255, verbose_name='Ошибка')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+                ('broadcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='bot.broadcast', verbose_name='Рассылка')),
+            ],
+            options={
+                'verbose_name': 'Доставка рассылки',
+                'verbose_name_plural': 'Доставки рассылок',
+                'unique_together': {('broadcast', 'telegram_id')},
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='delivery_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0015_broadcast_delivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='telegramuser',
+            name='delivery_status',
+            field=models.CharField(choices=[('active', 'Доступен'), ('blocked', 'Заблокировал бота'), ('deactivated', 'Аккаунт удален'), ('not_found', 'Чат не найден')], default='active', max_length=16, verbose_name='Доставка сообщений'),
+        ),
+        migrations.AddField(
+            model_name='telegramuser',
+            name='unreachable_since',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Недоступен с'),
+        ),
+        migrations.AddIndex(
+            model_name='telegramuser',
+            index=models.Index(condition=models.Q(('delivery_status', 'active')), fields=['id'], name='tguser_active_idx'),
+        ),
+    ]
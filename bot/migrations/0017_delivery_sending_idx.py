@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0016_telegramuser_delivery_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='broadcastdelivery',
+            index=models.Index(condition=models.Q(('status', 'sending')), fields=['updated_at'], name='delivery_sending_idx'),
+        ),
+    ]
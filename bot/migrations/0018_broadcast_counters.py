@@ -0,0 +1,47 @@
+# Generated by Django 5.2.1 on 2026-10-18 21:00
+
+from django.db import migrations, models
+
+
+# счетчики уже поставленных в очередь рассылок считаются по их доставкам
+FILL_COUNTERS_SQL = """
+    UPDATE bot_broadcast AS b SET
+        recipients_count = c.total,
+        sent_count = c.sent,
+        failed_count = c.failed
+    FROM (
+        SELECT broadcast_id,
+               count(*) AS total,
+               count(*) FILTER (WHERE status = 'sent') AS sent,
+               count(*) FILTER (WHERE status = 'failed') AS failed
+        FROM bot_broadcastdelivery
+        GROUP BY broadcast_id
+    ) AS c
+    WHERE b.id = c.broadcast_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0017_delivery_sending_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='broadcast',
+            name='recipients_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Получателей'),
+        ),
+        migrations.AddField(
+            model_name='broadcast',
+            name='sent_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Доставлено'),
+        ),
+        migrations.AddField(
+            model_name='broadcast',
+            name='failed_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Ошибок'),
+        ),
+        migrations.RunSQL(FILL_COUNTERS_SQL, migrations.RunSQL.noop),
+    ]
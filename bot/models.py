@@ -1,16 +1,41 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 # модель пользователя Telegram
 class TelegramUser(models.Model):
+    # можно ли доставить пользователю сообщение; обновляется по ошибкам Telegram и событиям my_chat_member
+    ACTIVE = 'active'
+    BLOCKED = 'blocked'
+    DEACTIVATED = 'deactivated'
+    NOT_FOUND = 'not_found'
+    DELIVERY_STATUS_CHOICES = [
+        (ACTIVE, "Доступен"),
+        (BLOCKED, "Заблокировал бота"),
+        (DEACTIVATED, "Аккаунт удален"),
+        (NOT_FOUND, "Чат не найден"),
+    ]
+
     telegram_id = models.BigIntegerField(unique=True, verbose_name="Telegram ID")
     username = models.CharField(max_length=150, blank=True, null=True, verbose_name="Username")
     first_name = models.CharField(max_length=150, blank=True, null=True, verbose_name="Имя")
     register_date = models.DateTimeField(auto_now_add=True, verbose_name="Дата регистрации")
+    delivery_status = models.CharField(
+        max_length=16,
+        choices=DELIVERY_STATUS_CHOICES,
+        default=ACTIVE,
+        verbose_name="Доставка сообщений"
+    )
+    unreachable_since = models.DateTimeField(null=True, blank=True, verbose_name="Недоступен с")
 
     class Meta:
         verbose_name = "Пользователь Telegram"
         verbose_name_plural = "Пользователи Telegram"
         ordering = ['-register_date']
+        indexes = [
+            # получатели рассылок: только доступные пользователи по порядку id
+            models.Index(fields=['id'], name='tguser_active_idx', condition=models.Q(delivery_status='active')),
+        ]
 
     def __str__(self):
         return f"{self.username or self.first_name or self.telegram_id}"
@@ -70,6 +95,39 @@ class Product(models.Model):
         null=True,
         blank=True
     )
+    image_telegram = models.ImageField(
+        upload_to='products/telegram/%Y/%m/%d/',
+        verbose_name="Фото для Telegram",
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_thumb = models.ImageField(
+        upload_to='products/thumbs/%Y/%m/%d/',
+        verbose_name="Превью фото",
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_derivatives_source = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name="Исходное фото производных"
+    )
+    image_file_id = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        verbose_name="Telegram file_id фото"
+    )
+    image_file_id_source = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        verbose_name="Версия фото для file_id"
+    )
     description = models.TextField(
         verbose_name="Описание товара"
     )
@@ -77,15 +135,29 @@ class Product(models.Model):
         auto_now_add=True,
         verbose_name="Дата добавления"
     )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name="Поисковый вектор"
+    )
 
     class Meta:
         verbose_name = "Товар"
         verbose_name_plural = "Товары"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['subcategory', '-created_at', '-id'], name='product_sub_created_idx'),
+            GinIndex(fields=['search_vector'], name='product_search_idx'),
+        ]
 
     def __str__(self):
         return f"{self.subcategory} - {self.description[:50]}..."
 
+    # производные изображения готовы для текущего фото
+    @property
+    def has_image_derivatives(self):
+        return bool(self.image) and self.image_derivatives_source == self.image.name
+
 
 # модель корзины пользователя
 class CartItem(models.Model):
@@ -138,15 +210,39 @@ class Order(models.Model):
         default=False,
         verbose_name="Оплачен"
     )
+    payment_id = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="ID платежа ЮKassa"
+    )
+    payment_status = models.CharField(
+        max_length=32,
+        default='pending',
+        verbose_name="Статус платежа"
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Дата создания заказа"
     )
+    # по последнему изменению заказов определяется, устарели ли готовые отчеты
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения"
+    )
 
     class Meta:
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
         ordering = ['-created_at']
+        indexes = [
+            # выгрузки заказов читают диапазоны по дате создания
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            # сверка платежей читает только неоплаченные заказы
+            models.Index(fields=['created_at'], name='order_unpaid_idx', condition=models.Q(is_paid=False)),
+        ]
 
     def __str__(self):
         return f"Заказ #{self.id} от {self.user}"
@@ -200,6 +296,24 @@ class Broadcast(models.Model):
         blank=True,
         verbose_name="Дата отправки"
     )
+    queued_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Поставлена в очередь"
+    )
+    # счетчики прогресса обновляются вместе с результатами доставок, чтобы админка не считала строки доставок
+    recipients_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Получателей"
+    )
+    sent_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Доставлено"
+    )
+    failed_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Ошибок"
+    )
 
     class Meta:
         verbose_name = "Рассылка"
@@ -208,3 +322,105 @@ class Broadcast(models.Model):
 
     def __str__(self):
         return f"{self.title} ({self.created_at.strftime('%d.%m.%Y %H:%M')})"
+
+
+# доставка рассылки одному получателю; строки разбирают процессы run_broadcasts
+class BroadcastDelivery(models.Model):
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, "Ожидает"),
+        (SENDING, "Отправляется"),
+        (SENT, "Доставлено"),
+        (FAILED, "Ошибка"),
+    ]
+
+    broadcast = models.ForeignKey(
+        Broadcast,
+        on_delete=models.CASCADE,
+        related_name='deliveries',
+        verbose_name="Рассылка"
+    )
+    telegram_id = models.BigIntegerField(
+        verbose_name="Telegram ID"
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name="Статус"
+    )
+    error = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Ошибка"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения"
+    )
+
+    class Meta:
+        verbose_name = "Доставка рассылки"
+        verbose_name_plural = "Доставки рассылок"
+        unique_together = ('broadcast', 'telegram_id')
+        indexes = [
+            # очередь на отправку: процессы забирают ожидающие строки по порядку id
+            models.Index(fields=['id'], name='delivery_pending_idx', condition=models.Q(status='pending')),
+            # возврат брошенных доставок в очередь читает только строки в работе
+            models.Index(fields=['updated_at'], name='delivery_sending_idx', condition=models.Q(status='sending')),
+        ]
+
+    def __str__(self):
+        return f"{self.broadcast_id} → {self.telegram_id}: {self.status}"
+
+
+# состояние FSM бота, общее для всех процессов бота
+class FSMRecord(models.Model):
+    key = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name="Ключ"
+    )
+    state = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        verbose_name="Состояние"
+    )
+    data = models.JSONField(
+        default=dict,
+        verbose_name="Данные"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения"
+    )
+
+    class Meta:
+        verbose_name = "Состояние FSM"
+        verbose_name_plural = "Состояния FSM"
+
+    def __str__(self):
+        return f"{self.key}: {self.state}"
+
+
+# граница последней инкрементальной выгрузки заказов администратора
+class ExportWatermark(models.Model):
+    admin_id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name="Telegram ID администратора"
+    )
+    exported_until = models.DateTimeField(
+        verbose_name="Заказы выгружены до"
+    )
+
+    class Meta:
+        verbose_name = "Отметка выгрузки"
+        verbose_name_plural = "Отметки выгрузок"
+
+    def __str__(self):
+        return f"{self.admin_id}: {self.exported_until:%d.%m.%Y %H:%M}"
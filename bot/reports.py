@@ -0,0 +1,138 @@
+import asyncio
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.postgres.aggregates import StringAgg
+from django.db.models import CharField, Q, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+from bot.models import Order
+
+ORDER_HEADERS = [
+    "ID заказа",
+    "Дата заказа",
+    "ФИО получателя",
+    "Телефон",
+    "Адрес",
+    "Статус оплаты",
+    "Telegram ID",
+    "Username",
+    "Товары",
+]
+
+# строк, читаемых с сервера за раз
+CHUNK_SIZE = 2000
+# по скольким первым строкам подбирается ширина столбцов
+WIDTH_SAMPLE_ROWS = 500
+MAX_COLUMN_WIDTH = 60
+
+_executor = None
+
+
+# заказы с товарами одной строкой; позиции склеиваются в базе, без отдельного запроса на заказ
+def _order_rows(orders):
+    rows = (
+        orders
+        .annotate(items_str=StringAgg(
+            Concat(
+                'items__product__subcategory__name', Value(' x '), Cast('items__quantity', CharField())
+            ),
+            delimiter=', ',
+            filter=Q(items__isnull=False),
+            default=Value(''),
+        ))
+        .order_by('created_at', 'id')
+        .values_list(
+            'id', 'created_at', 'full_name', 'phone_number', 'address', 'is_paid',
+            'user__telegram_id', 'user__username', 'items_str',
+        )
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for order_id, created_at, full_name, phone, address, is_paid, telegram_id, username, items in rows:
+        yield [
+            order_id,
+            timezone.localtime(created_at).strftime("%d.%m.%Y %H:%M"),
+            full_name,
+            phone,
+            address,
+            "Оплачен" if is_paid else "Не оплачен",
+            telegram_id,
+            username or "Нет username",
+            items,
+        ]
+
+
+def _column_widths(rows):
+    widths = [len(header) for header in ORDER_HEADERS]
+    for row in rows:
+        for col, value in enumerate(row):
+            widths[col] = max(widths[col], len(str(value)))
+    return [min(width + 2, MAX_COLUMN_WIDTH) for width in widths]
+
+
+# выгрузка заказов в xlsx потоком: write-only книга не держит ячейки в памяти,
+# ширина столбцов считается по первым строкам, файл собирается в памяти без записи в media/
+# фильтр по дате создания идет по индексу created_at; возвращает файл и число заказов
+def build_orders_xlsx(date_from=None, date_to=None, is_paid=None) -> tuple[bytes, int]:
+    orders = Order.objects.all()
+    if date_from is not None:
+        orders = orders.filter(created_at__gte=date_from)
+    if date_to is not None:
+        orders = orders.filter(created_at__lt=date_to)
+    if is_paid is not None:
+        orders = orders.filter(is_paid=is_paid)
+
+    rows = _order_rows(orders)
+    sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Заказы")
+    # в write-only режиме размеры задаются до первой строки
+    for col, width in enumerate(_column_widths(sample), 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+
+    ws.append(ORDER_HEADERS)
+    count = 0
+    for row in sample:
+        ws.append(row)
+        count += 1
+    for row in rows:
+        ws.append(row)
+        count += 1
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue(), count
+
+
+# отчеты строятся в отдельных процессах: сборка книги нагружает процессор и не должна держать цикл событий бота
+# процессы запускаются через spawn и настраивают Django сами, окружение наследуется от родителя
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=int(os.getenv('REPORT_WORKERS', '1')),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+    return _executor
+
+
+# запуск функции построения отчета в пуле; аргументы и результат передаются между процессами
+async def run_report(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), func, *args)
+
+
+def shutdown_reports():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
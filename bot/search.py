@@ -0,0 +1,66 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F
+
+from .models import Product
+
+# конфигурация полнотекстового поиска postgres со стеммингом для русского
+SEARCH_CONFIG = 'russian'
+
+# максимальное количество слов в поисковом запросе
+MAX_QUERY_WORDS = 8
+
+# пересчет поискового вектора: описание важнее названий подкатегории и категории
+_UPDATE_VECTOR_SQL = """
+    UPDATE bot_product AS p
+    SET search_vector =
+        setweight(to_tsvector('russian', coalesce(p.description, '')), 'A') ||
+        setweight(to_tsvector('russian', s.name), 'B') ||
+        setweight(to_tsvector('russian', c.name), 'C')
+    FROM bot_subcategory AS s
+    JOIN bot_category AS c ON c.id = s.category_id
+    WHERE p.subcategory_id = s.id AND {condition}
+"""
+
+
+# обновление поискового вектора у товаров, подкатегорий или категорий
+def update_search_vectors(product_ids=None, subcategory_ids=None, category_ids=None):
+    if product_ids:
+        condition, params = "p.id = ANY(%s)", [list(product_ids)]
+    elif subcategory_ids:
+        condition, params = "s.id = ANY(%s)", [list(subcategory_ids)]
+    elif category_ids:
+        condition, params = "c.id = ANY(%s)", [list(category_ids)]
+    else:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(_UPDATE_VECTOR_SQL.format(condition=condition), params)
+
+
+# запрос в формате to_tsquery: все слова с поиском по префиксу, чтобы искать по мере набора
+def build_search_query(text):
+    words = re.findall(r"\w+", text.lower())[:MAX_QUERY_WORDS]
+    if not words:
+        return None
+    raw = " & ".join(f"{word}:*" for word in words)
+    return SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG)
+
+
+# страница результатов поиска, отсортированных по релевантности
+# возвращает товары и признак наличия следующей страницы
+async def search_products(text, offset=0, limit=20):
+    query = build_search_query(text)
+    if query is None:
+        return [], False
+
+    queryset = (
+        Product.objects
+        .filter(search_vector=query)
+        .annotate(rank=SearchRank(F('search_vector'), query))
+        .select_related('subcategory')
+        .order_by('-rank', '-id')
+    )
+    products = [product async for product in queryset[offset:offset + limit + 1]]
+    return products[:limit], len(products) > limit
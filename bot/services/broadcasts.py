@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from bot.models import Broadcast, BroadcastDelivery, TelegramUser
+
+_DELIVERY = BroadcastDelivery._meta.db_table
+_BROADCAST = Broadcast._meta.db_table
+
+# получатели копируются в таблицу доставок одним INSERT ... SELECT внутри базы; недоступные пропускаются
+_QUEUE_SQL = f"""
+    INSERT INTO {_DELIVERY} (broadcast_id, telegram_id, status, error, updated_at)
+    SELECT %s, telegram_id, '{BroadcastDelivery.PENDING}', '', now()
+    FROM {TelegramUser._meta.db_table}
+    WHERE delivery_status = '{TelegramUser.ACTIVE}'
+    ON CONFLICT (broadcast_id, telegram_id) DO NOTHING
+"""
+
+# рассылка, с которой начинается очередь
+_NEXT_BROADCAST_SQL = f"""
+    SELECT broadcast_id FROM {_DELIVERY}
+    WHERE status = '{BroadcastDelivery.PENDING}'
+    ORDER BY id
+    LIMIT 1
+"""
+
+# очередная пачка ожидающих доставок рассылки по порядку id; строки, которые уже взял другой процесс, пропускаются
+_CLAIM_SQL = f"""
+    UPDATE {_DELIVERY} SET status = '{BroadcastDelivery.SENDING}', updated_at = now()
+    WHERE id IN (
+        SELECT id FROM {_DELIVERY}
+        WHERE status = '{BroadcastDelivery.PENDING}' AND broadcast_id = %s
+        ORDER BY id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, telegram_id
+"""
+
+# результаты находятся по уникальному индексу (broadcast_id, telegram_id);
+# счетчики рассылки увеличиваются тем же запросом и только для доставок, которые еще не были завершены
+_SAVE_RESULTS_SQL = f"""
+    WITH saved AS (
+        UPDATE {_DELIVERY} AS d
+        SET status = r.status, error = r.error, updated_at = now()
+        FROM unnest(%s::bigint[], %s::text[], %s::text[]) AS r(telegram_id, status, error)
+        WHERE d.broadcast_id = %s AND d.telegram_id = r.telegram_id
+          AND d.status IN ('{BroadcastDelivery.PENDING}', '{BroadcastDelivery.SENDING}')
+        RETURNING d.status
+    )
+    UPDATE {_BROADCAST} SET
+        sent_count = sent_count + (SELECT count(*) FROM saved WHERE status = '{BroadcastDelivery.SENT}'),
+        failed_count = failed_count + (SELECT count(*) FROM saved WHERE status = '{BroadcastDelivery.FAILED}')
+    WHERE id = %s
+"""
+
+# доставки процесса, который упал посреди пачки, возвращаются в очередь
+_RELEASE_STALE_SQL = f"""
+    UPDATE {_DELIVERY} SET status = '{BroadcastDelivery.PENDING}', updated_at = now()
+    WHERE status = '{BroadcastDelivery.SENDING}' AND updated_at < %s
+"""
+
+_FINISH_SQL = f"""
+    UPDATE {_BROADCAST} AS b SET sent = true, sent_at = now()
+    WHERE b.queued_at IS NOT NULL AND NOT b.sent
+      AND NOT EXISTS (
+          SELECT 1 FROM {_DELIVERY} AS d
+          WHERE d.broadcast_id = b.id AND d.status IN ('{BroadcastDelivery.PENDING}', '{BroadcastDelivery.SENDING}')
+      )
+    RETURNING b.id
+"""
+
+
+# постановка рассылки в очередь, возвращает число получателей
+def queue_broadcast(broadcast_id: int) -> int:
+    with transaction.atomic():
+        updated = Broadcast.objects.filter(id=broadcast_id, queued_at__isnull=True).update(queued_at=timezone.now())
+        if not updated:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(_QUEUE_SQL, [broadcast_id])
+            recipients = cursor.rowcount
+        Broadcast.objects.filter(id=broadcast_id).update(recipients_count=recipients)
+        return recipients
+
+
+def next_pending_broadcast():
+    with connection.cursor() as cursor:
+        cursor.execute(_NEXT_BROADCAST_SQL)
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+# telegram id получателей очередной пачки в порядке постановки в очередь
+def claim_deliveries(broadcast_id: int, limit: int) -> list[int]:
+    with connection.cursor() as cursor:
+        cursor.execute(_CLAIM_SQL, [broadcast_id, limit])
+        return [telegram_id for _, telegram_id in sorted(cursor.fetchall())]
+
+
+# результаты доставки: [(telegram_id, статус, текст ошибки)]
+def save_delivery_results(broadcast_id: int, results: list[tuple[int, str, str]]) -> None:
+    if not results:
+        return
+    telegram_ids, statuses, errors = zip(*results)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _SAVE_RESULTS_SQL, [list(telegram_ids), list(statuses), list(errors), broadcast_id, broadcast_id]
+        )
+
+
+def release_stale_deliveries(older_than: timedelta) -> int:
+    with connection.cursor() as cursor:
+        cursor.execute(_RELEASE_STALE_SQL, [timezone.now() - older_than])
+        return cursor.rowcount
+
+
+# отмечает отправленными рассылки, у которых не осталось доставок в работе
+def finish_broadcasts() -> list[int]:
+    with connection.cursor() as cursor:
+        cursor.execute(_FINISH_SQL)
+        return [row[0] for row in cursor.fetchall()]
+
@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.models import Count, Sum
+from django.db.models.functions import Substr
+
+from bot.models import CartItem
+
+_TABLE = CartItem._meta.db_table
+
+# добавление к количеству: новая позиция или увеличение существующей
+_ADD_SQL = f"""
+    INSERT INTO {_TABLE} (user_id, product_id, quantity)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (user_id, product_id)
+    DO UPDATE SET quantity = {_TABLE}.quantity + EXCLUDED.quantity
+    RETURNING quantity
+"""
+
+# установка точного количества
+_SET_SQL = f"""
+    INSERT INTO {_TABLE} (user_id, product_id, quantity)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (user_id, product_id)
+    DO UPDATE SET quantity = EXCLUDED.quantity
+    RETURNING quantity
+"""
+
+# уменьшение количества; позиция, у которой количество дошло бы до нуля, удаляется
+# обе ветки видят один снимок строки, поэтому срабатывает ровно одна из них
+_DECREMENT_SQL = f"""
+    WITH updated AS (
+        UPDATE {_TABLE} SET quantity = quantity - %(quantity)s
+        WHERE user_id = %(user_id)s AND product_id = %(product_id)s AND quantity > %(quantity)s
+        RETURNING quantity
+    ), deleted AS (
+        DELETE FROM {_TABLE}
+        WHERE user_id = %(user_id)s AND product_id = %(product_id)s AND quantity <= %(quantity)s
+        RETURNING 0 AS quantity
+    )
+    SELECT quantity FROM updated UNION ALL SELECT quantity FROM deleted
+"""
+
+_DELETE_SQL = f"DELETE FROM {_TABLE} WHERE user_id = %s AND product_id = %s"
+
+
+def _fetch_quantity(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+# все операции выполняются одним запросом без чтения товара и позиции заранее
+# если товара уже нет, база отклоняет вставку по внешнему ключу (IntegrityError)
+
+# добавление товара в корзину, возвращает итоговое количество
+async def add_to_cart(user_id: int, product_id: int, quantity: int = 1) -> int:
+    if quantity <= 0:
+        raise ValueError("Количество должно быть положительным")
+    return await sync_to_async(_fetch_quantity)(_ADD_SQL, [user_id, product_id, quantity])
+
+
+# установка количества товара в корзине; 0 удаляет позицию
+async def set_cart_quantity(user_id: int, product_id: int, quantity: int) -> int:
+    if quantity <= 0:
+        await sync_to_async(_fetch_quantity)(_DELETE_SQL, [user_id, product_id])
+        return 0
+    return await sync_to_async(_fetch_quantity)(_SET_SQL, [user_id, product_id, quantity])
+
+
+# уменьшение количества товара, возвращает остаток (0 - позиция удалена или ее не было)
+async def decrement_cart_item(user_id: int, product_id: int, quantity: int = 1) -> int:
+    if quantity <= 0:
+        raise ValueError("Количество должно быть положительным")
+    params = {'user_id': user_id, 'product_id': product_id, 'quantity': quantity}
+    return await sync_to_async(_fetch_quantity)(_DECREMENT_SQL, params)
+
+
+# строка корзины для вывода: описание обрезано еще в базе
+@dataclass
+class CartLine:
+    product_id: int
+    quantity: int
+    description: str
+
+
+# число позиций и общее количество товаров одним агрегирующим запросом
+async def cart_totals(user_id: int) -> tuple[int, int]:
+    totals = await CartItem.objects.filter(user_id=user_id).aaggregate(
+        positions=Count('id'),
+        units=Sum('quantity'),
+    )
+    return totals['positions'], totals['units'] or 0
+
+
+# одна страница корзины; из описания товара читается только начало
+async def cart_page(user_id: int, offset: int, limit: int, description_length: int = 80) -> list[CartLine]:
+    rows = (
+        CartItem.objects
+        .filter(user_id=user_id)
+        .order_by('id')
+        .values_list('product_id', 'quantity', Substr('product__description', 1, description_length + 1))
+        [offset:offset + limit]
+    )
+    return [CartLine(product_id, quantity, description) async for product_id, quantity, description in rows]
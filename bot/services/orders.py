@@ -0,0 +1,92 @@
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+
+from bot.models import CartItem, Order, OrderItem, TelegramUser
+
+# корзина переносится в заказ одним запросом: удаленные строки корзины сразу становятся позициями заказа
+# DELETE блокирует строки, поэтому повторное нажатие "оформить" не создаст второй заказ из той же корзины
+_MOVE_CART_SQL = f"""
+    WITH taken AS (
+        DELETE FROM {CartItem._meta.db_table}
+        WHERE user_id = %s
+        RETURNING product_id, quantity
+    )
+    INSERT INTO {OrderItem._meta.db_table} (order_id, product_id, quantity)
+    SELECT %s, product_id, quantity FROM taken
+"""
+
+
+# оформление заказа из корзины пользователя в одной транзакции
+# число запросов не зависит от количества позиций; для пустой корзины заказ не создается
+def place_order(user_id: int, full_name: str, phone_number: str, address: str) -> Optional[Order]:
+    with transaction.atomic():
+        order = Order.objects.create(
+            user_id=user_id,
+            full_name=full_name,
+            phone_number=phone_number,
+            address=address,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(_MOVE_CART_SQL, [user_id, order.id])
+            moved = cursor.rowcount
+
+        if not moved:
+            transaction.set_rollback(True)
+            return None
+    return order
+
+
+async def aplace_order(user_id: int, full_name: str, phone_number: str, address: str) -> Optional[Order]:
+    return await sync_to_async(place_order)(user_id, full_name, phone_number, address)
+
+
+# новые статусы платежей применяются одним UPDATE; оплаченный заказ больше не меняется
+# возвращаются только заказы, которые этим запросом стали оплаченными: (id заказа, telegram_id)
+_APPLY_STATUSES_SQL = f"""
+    UPDATE {Order._meta.db_table} AS o
+    SET payment_status = s.status, is_paid = (s.status = 'succeeded'), updated_at = now()
+    FROM unnest(%s::text[], %s::text[]) AS s(payment_id, status), {TelegramUser._meta.db_table} AS u
+    WHERE o.payment_id = s.payment_id
+      AND u.id = o.user_id
+      AND NOT o.is_paid
+      AND o.payment_status <> s.status
+    RETURNING o.id, u.telegram_id, o.is_paid
+"""
+
+
+def apply_payment_statuses(statuses: dict[str, str]) -> list[tuple[int, int]]:
+    if not statuses:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(_APPLY_STATUSES_SQL, [list(statuses), list(statuses.values())])
+        rows = cursor.fetchall()
+    return [(order_id, telegram_id) for order_id, telegram_id, is_paid in rows if is_paid]
+
+
+async def aapply_payment_statuses(statuses: dict[str, str]) -> list[tuple[int, int]]:
+    return await sync_to_async(apply_payment_statuses)(statuses)
+
+
+# платежи, созданные в ЮKassa, но не сохраненные в заказе (ответ на создание не дошел до бота)
+_ATTACH_PAYMENTS_SQL = f"""
+    UPDATE {Order._meta.db_table} AS o
+    SET payment_id = p.payment_id, updated_at = now()
+    FROM unnest(%s::bigint[], %s::text[]) AS p(order_id, payment_id)
+    WHERE o.id = p.order_id AND o.payment_id IS NULL
+    RETURNING o.payment_id
+"""
+
+
+# привязка платежей к заказам {id заказа: id платежа}; возвращает id привязанных платежей
+def attach_payments(payments: dict[int, str]) -> list[str]:
+    if not payments:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(_ATTACH_PAYMENTS_SQL, [list(payments), list(payments.values())])
+        return [row[0] for row in cursor.fetchall()]
+
+
+async def aattach_payments(payments: dict[int, str]) -> list[str]:
+    return await sync_to_async(attach_payments)(payments)
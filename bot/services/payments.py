@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import AsyncIterator, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = "https://api.yookassa.ru/v3"
+
+# коды, после которых запрос имеет смысл повторить с тем же ключом идемпотентности
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PaymentError(Exception):
+    pass
+
+
+# временная ошибка на стороне API, запрос повторяется
+class _TemporaryError(Exception):
+    pass
+
+
+# платеж в том виде, в котором он нужен боту и обработчику уведомлений
+@dataclass
+class PaymentInfo:
+    id: str
+    status: str
+    paid: bool
+    confirmation_url: Optional[str] = None
+    metadata: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_api(cls, payload: dict) -> "PaymentInfo":
+        confirmation = payload.get('confirmation') or {}
+        return cls(
+            id=payload['id'],
+            status=payload['status'],
+            paid=payload.get('paid', False),
+            confirmation_url=confirmation.get('confirmation_url'),
+            metadata=payload.get('metadata') or {},
+        )
+
+
+# асинхронный клиент API ЮKassa: одна сессия с пулом keep-alive соединений на процесс,
+# таймауты на каждый запрос и повторы с тем же Idempotence-Key, чтобы повтор не создал второй платеж
+class YooKassaGateway:
+    def __init__(
+        self,
+        shop_id: str,
+        secret_key: str,
+        api_url: str = DEFAULT_API_URL,
+        timeout: float = 10.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        pool_size: int = 20,
+    ):
+        self.api_url = api_url.rstrip('/')
+        self.retries = retries
+        self.backoff = backoff
+        self._auth = aiohttp.BasicAuth(shop_id or '', secret_key or '')
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._pool_size = pool_size
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+
+    # сессия привязана к циклу событий; в Django без ASGI у каждого запроса свой цикл
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(
+                auth=self._auth,
+                timeout=self._timeout,
+                connector=aiohttp.TCPConnector(limit=self._pool_size, keepalive_timeout=60),
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, method: str, path: str, json: dict = None, params: dict = None,
+                       idempotence_key: str = None) -> dict:
+        headers = {'Idempotence-Key': idempotence_key} if idempotence_key else {}
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._send(method, path, json, params, headers)
+            except (_TemporaryError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            if attempt < self.retries:
+                delay = self.backoff * 2 ** attempt
+                logger.warning(f"Запрос к ЮKassa {method} {path} не удался ({error!r}), повтор через {delay:.1f} с")
+                await asyncio.sleep(delay)
+        raise PaymentError(f"ЮKassa недоступна: {error!r}") from error
+
+    async def _send(self, method, path, json, params, headers) -> dict:
+        async with self._get_session().request(
+            method, f"{self.api_url}{path}", json=json, params=params, headers=headers
+        ) as response:
+            if response.status in _RETRY_STATUSES:
+                raise _TemporaryError(f"ответ {response.status}")
+            if response.status >= 400:
+                text = await response.text()
+                raise PaymentError(f"ЮKassa отклонила {method} {path}: {response.status} {text[:200]}")
+            return await response.json(content_type=None)
+
+    # создание платежа с подтверждением по ссылке
+    async def create_payment(self, amount: Decimal, description: str, return_url: str,
+                             metadata: dict = None, idempotence_key: str = None) -> PaymentInfo:
+        payload = await self._request('POST', '/payments', json={
+            'amount': {'value': f"{Decimal(amount):.2f}", 'currency': 'RUB'},
+            'confirmation': {'type': 'redirect', 'return_url': return_url},
+            'capture': True,
+            'description': description,
+            'metadata': metadata or {},
+        }, idempotence_key=idempotence_key or str(uuid.uuid4()))
+        return PaymentInfo.from_api(payload)
+
+    async def get_payment(self, payment_id: str) -> PaymentInfo:
+        return PaymentInfo.from_api(await self._request('GET', f'/payments/{payment_id}'))
+
+    # все платежи, созданные начиная с created_after, страницами по 100 штук
+    async def list_payments(self, created_after: datetime, status: str = None) -> AsyncIterator[PaymentInfo]:
+        params = {'created_at.gte': created_after.isoformat(), 'limit': 100}
+        if status:
+            params['status'] = status
+        while True:
+            payload = await self._request('GET', '/payments', params=params)
+            for item in payload.get('items', []):
+                yield PaymentInfo.from_api(item)
+            cursor = payload.get('next_cursor')
+            if not cursor:
+                return
+            params['cursor'] = cursor
+
+
+# клиент с настройками из окружения
+# YOOKASSA_API_URL позволяет направить запросы на локальный fake_yookassa
+def create_gateway() -> YooKassaGateway:
+    return YooKassaGateway(
+        shop_id=os.getenv('YOOKASSA_SHOP_ID'),
+        secret_key=os.getenv('YOOKASSA_SECRET_KEY'),
+        api_url=os.getenv('YOOKASSA_API_URL', DEFAULT_API_URL),
+        timeout=float(os.getenv('YOOKASSA_TIMEOUT', '10')),
+        retries=int(os.getenv('YOOKASSA_RETRIES', '3')),
+    )
@@ -0,0 +1,54 @@
+from typing import Optional
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from asgiref.sync import sync_to_async
+from django.db import connection
+
+from bot.models import TelegramUser
+
+# тексты ошибок Telegram, после которых писать пользователю бесполезно
+_UNREACHABLE_ERRORS = (
+    ("bot was blocked by the user", TelegramUser.BLOCKED),
+    ("user is deactivated", TelegramUser.DEACTIVATED),
+    ("chat not found", TelegramUser.NOT_FOUND),
+)
+
+# статус меняется только у доступных пользователей, чтобы сохранить дату первой ошибки
+_MARK_UNREACHABLE_SQL = f"""
+    UPDATE {TelegramUser._meta.db_table} AS u
+    SET delivery_status = s.status, unreachable_since = now()
+    FROM unnest(%s::bigint[], %s::text[]) AS s(telegram_id, status)
+    WHERE u.telegram_id = s.telegram_id AND u.delivery_status = '{TelegramUser.ACTIVE}'
+"""
+
+
+# статус недоступности по ошибке отправки или None, если ошибка временная
+def unreachable_status(error) -> Optional[str]:
+    if not isinstance(error, (TelegramForbiddenError, TelegramBadRequest)):
+        return None
+    message = str(error.message).lower()
+    for text, status in _UNREACHABLE_ERRORS:
+        if text in message:
+            return status
+    if isinstance(error, TelegramForbiddenError):
+        return TelegramUser.BLOCKED
+    return None
+
+
+# {telegram_id: статус} одним запросом
+def mark_users_unreachable(statuses: dict[int, str]) -> int:
+    if not statuses:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(_MARK_UNREACHABLE_SQL, [list(statuses), list(statuses.values())])
+        return cursor.rowcount
+
+
+async def amark_users_unreachable(statuses: dict[int, str]) -> int:
+    return await sync_to_async(mark_users_unreachable)(statuses)
+
+
+async def amark_user_active(telegram_id: int) -> int:
+    return await TelegramUser.objects.filter(telegram_id=telegram_id).exclude(
+        delivery_status=TelegramUser.ACTIVE
+    ).aupdate(delivery_status=TelegramUser.ACTIVE, unreachable_since=None)
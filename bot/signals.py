@@ -0,0 +1,47 @@
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .images import schedule_product_derivatives
+from .models import Category, Subcategory, Product
+from .search import update_search_vectors
+
+# канал postgres, по которому процессы бота узнают об изменении каталога
+CATALOG_CHANNEL = "catalog_changed"
+
+
+# оповещение всех процессов об изменении дерева каталога
+# NOTIFY транзакционный, поэтому уйдет только после коммита
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Subcategory)
+@receiver(post_delete, sender=Subcategory)
+def notify_catalog_changed(sender, **kwargs):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, '')", [CATALOG_CHANNEL])
+
+
+# генерация фото для Telegram и превью после загрузки нового фото товара
+@receiver(post_save, sender=Product)
+def generate_image_derivatives(sender, instance, **kwargs):
+    if instance.image and not instance.has_image_derivatives:
+        transaction.on_commit(lambda: schedule_product_derivatives(instance.id))
+
+
+# пересчет поискового вектора товара после сохранения
+@receiver(post_save, sender=Product)
+def update_product_search_vector(sender, instance, **kwargs):
+    update_search_vectors(product_ids=[instance.id])
+
+
+# названия подкатегорий и категорий тоже участвуют в поиске
+@receiver(post_save, sender=Subcategory)
+def update_subcategory_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(subcategory_ids=[instance.id])
+
+
+@receiver(post_save, sender=Category)
+def update_category_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vectors(category_ids=[instance.id])
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.client.bot import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.enums import ParseMode
+
+logger = logging.getLogger(__name__)
+
+# боты по циклам событий: сессия aiohttp привязана к циклу, в котором открыта
+_bots = {}
+_closers = {}
+_session_middlewares = []
+
+
+# сессия aiohttp с настроенным пулом: соединения с api.telegram.org переиспользуются,
+# DNS кэшируется, простаивающие keep-alive соединения держатся дольше значения aiohttp по умолчанию
+# у AiohttpSession нет публичных параметров коннектора, кроме limit, поэтому дополняется _connector_init;
+# его формат одинаков во всех версиях aiogram 3, версия ограничена в requirements.txt
+class TelegramSession(AiohttpSession):
+    def __init__(self, limit: int = 100, keepalive_timeout: float = 60.0, dns_cache_ttl: int = 300, **kwargs):
+        super().__init__(limit=limit, **kwargs)
+        self._connector_init.update(
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=dns_cache_ttl,
+            enable_cleanup_closed=True,
+        )
+
+
+# мидлвари, которые подключаются к сессии каждого создаваемого бота (например, из процесса бота)
+def add_session_middleware(middleware):
+    _session_middlewares.append(middleware)
+
+
+def _create_bot(token: str) -> Bot:
+    session = TelegramSession(
+        limit=int(os.getenv('TELEGRAM_POOL_SIZE', '100')),
+        keepalive_timeout=float(os.getenv('TELEGRAM_KEEPALIVE', '60')),
+        dns_cache_ttl=int(os.getenv('TELEGRAM_DNS_CACHE_TTL', '300')),
+    )
+    for middleware in _session_middlewares:
+        session.middleware(middleware)
+    return Bot(token=token, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+
+async def _release(loop):
+    bot = _bots.pop(loop, None)
+    _closers.pop(loop, None)
+    if bot is not None:
+        try:
+            await bot.session.close()
+        except Exception as e:
+            logger.error(f"Ошибка закрытия сессии Telegram: {e}")
+
+
+# фоновая задача цикла: asyncio.run и async_to_sync отменяют оставшиеся задачи перед закрытием цикла,
+# поэтому сессия закрывается и тогда, когда владелец не вызвал close_shared_bot
+# (runserver, где у каждого асинхронного представления свой цикл, отдельные asyncio.run)
+async def _close_on_shutdown(loop, bot: Bot):
+    try:
+        await loop.create_future()
+    except asyncio.CancelledError:
+        if _bots.get(loop) is bot:
+            await _release(loop)
+        raise
+
+
+# один бот и один пул соединений на цикл событий процесса: общий для Django (уведомления, рассылки)
+# и процесса бота; бот, созданный до запуска цикла, достается первому циклу, который к нему обратится
+def get_shared_bot() -> Optional[Bot]:
+    token = os.getenv('TELEGRAM_TOKEN')
+    if not token:
+        return None
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    bot = _bots.get(loop)
+    if bot is None:
+        # циклы, закрытые раньше, чем запустилась их задача закрытия: сессия в них не открывалась
+        for closed in [key for key in _bots if key is not None and key.is_closed()]:
+            _bots.pop(closed)
+            _closers.pop(closed, None)
+        bot = (_bots.pop(None, None) if loop is not None else None) or _create_bot(token)
+        _bots[loop] = bot
+        if loop is not None:
+            _closers[loop] = loop.create_task(_close_on_shutdown(loop, bot))
+    return bot
+
+
+# закрытие бота текущего цикла событий
+async def close_shared_bot():
+    loop = asyncio.get_running_loop()
+    closer = _closers.get(loop)
+    await _release(loop)
+    if closer is not None:
+        closer.cancel()
+
+
+# обертка ASGI-приложения: закрывает общий пул соединений при остановке сервера
+class TelegramLifespan:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'lifespan':
+            await self.app(scope, receive, send)
+            return
+
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                get_shared_bot()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                try:
+                    await close_shared_bot()
+                except Exception as e:
+                    logger.error(f"Ошибка закрытия сессии Telegram: {e}")
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -1,36 +1,26 @@
-import os
 from typing import Optional
 from aiogram import Bot
-from aiogram.enums import ParseMode
-from aiogram.client.bot import DefaultBotProperties
 
-# функция для инициализации бота Telegram
+from bot.telegram import get_shared_bot
+
+# функция для получения бота Telegram: общий на процесс, сессию закрывает владелец процесса
 async def get_bot() -> Optional[Bot]:
-    token = os.getenv('TELEGRAM_TOKEN')
-    if not token:
-        return None
-    return Bot(token=token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    return get_shared_bot()
 
-# функция для отправки массовой рассылки пользователям
-async def send_broadcast(user_ids: list[int], title: str, message: str) -> tuple[int, list[int]]:
+# уведомление покупателей о проведенной оплате заказов
+async def notify_orders_paid(paid_orders: list[tuple[int, int]]) -> None:
+    if not paid_orders:
+        return
     bot = await get_bot()
     if not bot:
-        return 0, user_ids
-
-    success_count = 0
-    failed_ids = []
-    
-    formatted_message = f"<b>{title}</b>\n\n{message}"
-
-    try:
-        for user_id in user_ids:
-            try:
-                await bot.send_message(chat_id=user_id, text=formatted_message)
-                success_count += 1
-            except Exception as e:
-                print(f"Ошибка отправки сообщения пользователю {user_id}: {e}")
-                failed_ids.append(user_id)
-    finally:
-        await bot.session.close()
+        return
 
-    return success_count, failed_ids
+    for order_id, telegram_id in paid_orders:
+        try:
+            await bot.send_message(
+                chat_id=telegram_id,
+                text=f"✅ Заказ #{order_id} успешно оплачен!\n\n"
+                     "Спасибо за покупку! Мы свяжемся с вами для уточнения деталей доставки."
+            )
+        except Exception as e:
+            print(f"Ошибка уведомления об оплате заказа #{order_id}: {e}")
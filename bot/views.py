@@ -1,3 +1,43 @@
-from django.shortcuts import render
+import json
+import logging
 
-# Create your views here.
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from bot.services.orders import aapply_payment_statuses
+from bot.services.payments import PaymentError, create_gateway
+from bot.utils import notify_orders_paid
+
+logger = logging.getLogger(__name__)
+
+_gateway = None
+
+
+def _get_gateway():
+    global _gateway
+    if _gateway is None:
+        _gateway = create_gateway()
+    return _gateway
+
+
+# уведомление ЮKassa об изменении статуса платежа
+# телу уведомления не доверяем: статус перечитывается из API по id платежа
+@csrf_exempt
+@require_POST
+async def yookassa_notification(request):
+    try:
+        payment_id = json.loads(request.body)['object']['id']
+    except (ValueError, KeyError, TypeError):
+        return HttpResponseBadRequest()
+
+    try:
+        payment = await _get_gateway().get_payment(payment_id)
+    except PaymentError as e:
+        # ответ с ошибкой - ЮKassa повторит уведомление позже
+        logger.error(f"Не удалось проверить платеж {payment_id}: {e}")
+        return HttpResponse(status=502)
+
+    paid = await aapply_payment_statuses({payment.id: payment.status})
+    await notify_orders_paid(paid)
+    return HttpResponse()
@@ -3,10 +3,6 @@ import sys
 import asyncio
 
 from dotenv import load_dotenv
-from aiogram import Dispatcher
-from aiogram.enums import ParseMode
-from aiogram.client.bot import Bot, DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 load_dotenv(os.path.join(BASE_DIR, '.env'))
@@ -19,36 +15,41 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shop_test.settings')
 import django
 django.setup()
 
-bot = Bot(token=TELEGRAM_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-dp = Dispatcher(storage=MemoryStorage())
+from bot.telegram import close_shared_bot
+from tg_bot.app import create_bot, create_dispatcher
 
-from tg_bot.middleware import LoggingMiddleware
-dp.message.middleware(LoggingMiddleware())
-dp.callback_query.middleware(LoggingMiddleware())
-
-from tg_bot.handlers import (
-    start_router, catalog_router, product_router, 
-    cart_router, order_router, faq_router, admin_router
-)
-
-dp.include_router(start_router)
-dp.include_router(catalog_router)
-dp.include_router(product_router)
-dp.include_router(cart_router)
-dp.include_router(order_router)
-dp.include_router(faq_router)
-dp.include_router(admin_router)
+# режим работы: polling (по умолчанию, для разработки) или webhook
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
 
 async def main():
+    bot = create_bot()
+    dp = create_dispatcher()
     try:
         print("Запускаю бота...")
+        await bot.delete_webhook()
         await dp.start_polling(bot)
     except Exception as e:
         print(f"Ошибка бота: {e}")
         raise
     finally:
         print("Завершаю работу бота...")
-        await bot.session.close()
+        await close_shared_bot()
+
+# отдельный сервер для приема вебхуков
+def run_webhook():
+    import uvicorn
+    from tg_bot.webhook import create_webhook_app
+
+    print("Запускаю бота в режиме вебхука...")
+    uvicorn.run(
+        create_webhook_app(),
+        host=os.getenv('WEBHOOK_HOST', '0.0.0.0'),
+        port=int(os.getenv('WEBHOOK_PORT', '8080')),
+        lifespan="on",
+    )
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if BOT_MODE == 'webhook':
+        run_webhook()
+    else:
+        asyncio.run(main())
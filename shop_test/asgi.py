@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "shop_test.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# при WEBHOOK_MOUNT=1 вебхук бота принимается этим же приложением рядом с Django
+if os.getenv("WEBHOOK_MOUNT", "").lower() in ("1", "true", "yes"):
+    from tg_bot.webhook import create_webhook_app
+
+    application = create_webhook_app(fallback=django_application)
+else:
+    from bot.telegram import TelegramLifespan
+
+    # общий пул соединений с Telegram закрывается при остановке сервера
+    application = TelegramLifespan(django_application)
@@ -3,8 +3,11 @@ from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from bot.views import yookassa_notification
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("payments/yookassa/", yookassa_notification, name="yookassa_notification"),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,80 @@
+import asyncio
+import os
+
+from aiogram import Bot, Dispatcher
+
+from bot.reports import shutdown_reports
+from bot.services.payments import create_gateway
+from bot.telegram import add_session_middleware, get_shared_bot
+from tg_bot.callbacks import callbacks
+from tg_bot.catalog_cache import listen_for_catalog_changes
+from tg_bot.handlers import (
+    start_router, catalog_router, product_router,
+    cart_router, order_router, faq_router, admin_router, search_router
+)
+from tg_bot.middleware import DeliverabilityMiddleware, LoggingMiddleware, ThrottlingMiddleware, UserMiddleware
+from tg_bot.storage import PostgresStorage, create_storage
+
+
+# ошибки доставки из обычных ответов бота отмечают недоступных пользователей
+add_session_middleware(DeliverabilityMiddleware())
+
+
+# бот процесса с общим пулом соединений (тот же, что используют уведомления и рассылки)
+def create_bot() -> Bot:
+    bot = get_shared_bot()
+    if bot is None:
+        raise RuntimeError("TELEGRAM_TOKEN не найден в .env")
+    return bot
+
+
+# фоновые задачи процесса бота запускаются вместе с диспетчером (polling или webhook)
+async def _start_background_tasks(dispatcher: Dispatcher):
+    tasks = [asyncio.create_task(listen_for_catalog_changes())]
+    if isinstance(dispatcher.storage, PostgresStorage):
+        tasks.append(asyncio.create_task(dispatcher.storage.run_cleanup()))
+    dispatcher["background_tasks"] = tasks
+
+
+async def _stop_background_tasks(dispatcher: Dispatcher):
+    for task in dispatcher.workflow_data.pop("background_tasks", []):
+        task.cancel()
+    await dispatcher["payments"].close()
+    shutdown_reports()
+
+
+# сборка диспетчера: хранилище, мидлвари и роутеры
+def create_dispatcher() -> Dispatcher:
+    dp = Dispatcher(storage=create_storage())
+
+    # ограничение частоты срабатывает до фильтров и запросов к базе
+    throttling = ThrottlingMiddleware(
+        rate=float(os.getenv('THROTTLE_RATE', '3')),
+        burst=int(os.getenv('THROTTLE_BURST', '6')),
+    )
+    dp.message.outer_middleware(throttling)
+    dp.callback_query.outer_middleware(throttling)
+    dp["throttling"] = throttling
+
+    # клиент ЮKassa с общим пулом соединений для всех обработчиков
+    dp["payments"] = create_gateway()
+
+    user_middleware = UserMiddleware()
+    dp.message.middleware(LoggingMiddleware())
+    dp.callback_query.middleware(LoggingMiddleware())
+    dp.message.middleware(user_middleware)
+    dp.callback_query.middleware(user_middleware)
+
+    dp.include_router(callbacks.router)
+    dp.include_router(start_router)
+    dp.include_router(catalog_router)
+    dp.include_router(product_router)
+    dp.include_router(cart_router)
+    dp.include_router(order_router)
+    dp.include_router(search_router)
+    dp.include_router(faq_router)
+    dp.include_router(admin_router)
+
+    dp.startup.register(_start_background_tasks)
+    dp.shutdown.register(_stop_background_tasks)
+    return dp
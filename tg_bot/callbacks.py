@@ -0,0 +1,119 @@
+import inspect
+import logging
+
+from aiogram import Router
+from aiogram.types import CallbackQuery
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = ":"
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def _to_base36(value: int) -> str:
+    if value < 0:
+        raise ValueError("Поля callback_data должны быть неотрицательными")
+    if value == 0:
+        return "0"
+    digits = []
+    while value:
+        value, rest = divmod(value, 36)
+        digits.append(_DIGITS[rest])
+    return "".join(reversed(digits))
+
+
+# тип callback_data: короткий префикс и целые поля в base36
+# например SUBCATEGORY.pack(71) == "s:1z"
+class CallbackAction:
+    def __init__(self, prefix: str, *fields: str):
+        if SEPARATOR in prefix:
+            raise ValueError(f"Недопустимый префикс callback_data: {prefix!r}")
+        self.prefix = prefix
+        self.fields = fields
+
+    def pack(self, *values: int) -> str:
+        if len(values) != len(self.fields):
+            raise ValueError(f"{self.prefix}: ожидается полей {len(self.fields)}, передано {len(values)}")
+        return SEPARATOR.join((self.prefix, *(_to_base36(value) for value in values)))
+
+    def unpack(self, payload: str) -> dict:
+        values = payload.split(SEPARATOR) if payload else []
+        if len(values) != len(self.fields):
+            raise ValueError(f"{self.prefix}: неверное количество полей")
+        return {field: int(value, 36) for field, value in zip(self.fields, values)}
+
+
+# навигация по каталогу
+SHOW_CATALOG = CallbackAction("ct")
+CATEGORY = CallbackAction("c", "category_id")
+BACK_TO_CATEGORIES = CallbackAction("bc")
+SUBCATEGORY = CallbackAction("s", "sub_id")
+BACK_TO_SUBCATEGORY = CallbackAction("bs", "sub_id")
+SHOW_PRODUCT = CallbackAction("sp", "product_id")
+NEXT_PRODUCT = CallbackAction("n")
+PREV_PRODUCT = CallbackAction("p")
+SEARCH_PAGE = CallbackAction("sr", "offset")
+
+# корзина
+ADD_TO_CART = CallbackAction("a")
+CONFIRM_ADD = CallbackAction("ya")
+CANCEL_ADD = CallbackAction("xa")
+VIEW_CART = CallbackAction("vc")
+CART_PAGE = CallbackAction("cp", "page")
+CART_INCREASE = CallbackAction("ci", "product_id", "page")
+CART_DECREASE = CallbackAction("cd", "product_id", "page")
+CLEAR_CART = CallbackAction("cc")
+REMOVE_FROM_CART = CallbackAction("rc", "product_id", "page")
+CHECKOUT = CallbackAction("co")
+
+# заказ
+CONFIRM_ORDER = CallbackAction("yo")
+COMPLETE_ORDER = CallbackAction("ok")
+CANCEL_ORDER = CallbackAction("xo")
+
+# главное меню и FAQ
+BACK_TO_START = CallbackAction("h")
+SHOW_FAQ = CallbackAction("f")
+FAQ_TOPIC = CallbackAction("ft", "topic_index")
+
+
+# маршрутизация всех callback-запросов одним поиском префикса в словаре
+# обработчик получает распакованные поля и только те данные aiogram, которые объявил в сигнатуре
+class CallbackDispatcher:
+    def __init__(self):
+        self._routes = {}
+        self.router = Router(name="callbacks")
+        self.router.callback_query.register(self._dispatch)
+
+    def handler(self, action: CallbackAction):
+        def decorator(func):
+            if action.prefix in self._routes:
+                raise RuntimeError(f"Префикс callback_data {action.prefix!r} уже зарегистрирован")
+            params = inspect.signature(func).parameters
+            accepts_any = any(param.kind is inspect.Parameter.VAR_KEYWORD for param in params.values())
+            self._routes[action.prefix] = (action, func, None if accepts_any else frozenset(params))
+            return func
+        return decorator
+
+    async def _dispatch(self, query: CallbackQuery, **data):
+        prefix, _, payload = (query.data or "").partition(SEPARATOR)
+        route = self._routes.get(prefix)
+        if route is None:
+            # кнопка из старой версии бота или чужие данные
+            await query.answer()
+            return None
+
+        action, func, params = route
+        try:
+            values = action.unpack(payload)
+        except ValueError:
+            logger.warning(f"Некорректные callback_data: {query.data!r}")
+            await query.answer()
+            return None
+
+        if params is not None:
+            data = {key: value for key, value in data.items() if key in params}
+        return await func(query, **data, **values)
+
+
+callbacks = CallbackDispatcher()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+
+import psycopg
+from psycopg.conninfo import make_conninfo
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+
+from bot.models import Category, Subcategory
+from bot.signals import CATALOG_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+
+# кэш дерева категорий и подкатегорий в памяти процесса бота
+# загружается целиком двумя запросами и сбрасывается при любом изменении каталога
+class CatalogCache:
+    def __init__(self):
+        self._categories = None
+        self._subcategories = {}
+        self._subcategory_by_id = {}
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    async def _ensure_loaded(self):
+        if self._categories is not None:
+            return
+        async with self._lock:
+            if self._categories is not None:
+                return
+            # каталог поменялся во время загрузки - результат уже устарел, загружаем заново
+            while True:
+                generation = self._generation
+                categories = [cat async for cat in Category.objects.all()]
+                subcategories = {}
+                subcategory_by_id = {}
+                async for sub in Subcategory.objects.all():
+                    subcategories.setdefault(sub.category_id, []).append(sub)
+                    subcategory_by_id[sub.id] = sub
+                if generation == self._generation:
+                    break
+
+            self._subcategories = subcategories
+            self._subcategory_by_id = subcategory_by_id
+            self._categories = categories
+
+    async def categories(self):
+        await self._ensure_loaded()
+        return self._categories
+
+    async def subcategories(self, category_id):
+        await self._ensure_loaded()
+        return self._subcategories.get(category_id, [])
+
+    async def subcategory(self, subcategory_id):
+        await self._ensure_loaded()
+        return self._subcategory_by_id.get(subcategory_id)
+
+    def invalidate(self):
+        self._generation += 1
+        self._categories = None
+        self._subcategories = {}
+        self._subcategory_by_id = {}
+
+
+catalog_cache = CatalogCache()
+
+
+# сброс кэша при изменениях, сделанных в этом же процессе
+def _invalidate_catalog(sender, **kwargs):
+    catalog_cache.invalidate()
+
+
+for _model in (Category, Subcategory):
+    post_save.connect(_invalidate_catalog, sender=_model, dispatch_uid=f"catalog_cache_save_{_model.__name__}")
+    post_delete.connect(_invalidate_catalog, sender=_model, dispatch_uid=f"catalog_cache_delete_{_model.__name__}")
+
+
+def _conninfo():
+    db = settings.DATABASES['default']
+    params = {
+        'dbname': db.get('NAME'),
+        'user': db.get('USER'),
+        'password': db.get('PASSWORD'),
+        'host': db.get('HOST'),
+        'port': db.get('PORT'),
+    }
+    return make_conninfo(**{key: value for key, value in params.items() if value})
+
+
+# фоновая задача: слушает уведомления об изменении каталога из других процессов (админка)
+async def listen_for_catalog_changes(reconnect_delay: float = 5.0):
+    while True:
+        try:
+            aconn = await psycopg.AsyncConnection.connect(_conninfo(), autocommit=True)
+            async with aconn:
+                await aconn.execute(f"LISTEN {CATALOG_CHANNEL}")
+                # пока соединения не было, уведомления могли потеряться
+                catalog_cache.invalidate()
+                async for _ in aconn.notifies():
+                    catalog_cache.invalidate()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка подписки на изменения каталога: {e}")
+            await asyncio.sleep(reconnect_delay)
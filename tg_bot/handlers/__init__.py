@@ -4,4 +4,5 @@ from .product import router as product_router
 from .cart import router as cart_router
 from .order import router as order_router
 from .faq import router as faq_router
-from .admin import router as admin_router
\ No newline at end of file
+from .admin import router as admin_router
+from .search import router as search_router
\ No newline at end of file
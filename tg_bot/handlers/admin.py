@@ -1,79 +1,189 @@
-from datetime import datetime
+import asyncio
+import logging
 import os
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Optional
 from aiogram import Router, F
-from aiogram.filters import Command
-from aiogram.types import Message, FSInputFile
-import openpyxl
-from bot.models import Order, OrderItem
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, BufferedInputFile
+from django.db.models import Count, Max
+from django.utils import timezone
+from bot.models import ExportWatermark, Order
+from bot.reports import build_orders_xlsx, run_report
+from tg_bot.middleware import ThrottlingMiddleware
+from tg_bot.report_cache import report_cache
+
+logger = logging.getLogger(__name__)
+
+# административные команды доступны только пользователям из ADMIN_IDS (telegram id через запятую)
+ADMIN_IDS = frozenset(
+    int(admin_id) for admin_id in os.getenv('ADMIN_IDS', '').replace(' ', '').split(',') if admin_id
+)
 
 router = Router()
+router.message.filter(F.from_user.id.in_(ADMIN_IDS))
+
+# задачи отправки отчетов, чтобы их не собрал сборщик мусора до завершения
+_report_tasks = set()
+
+EXPORT_HELP = (
+    "Использование: /admin_xlsx [период] [paid|unpaid]\n\n"
+    "Период:\n"
+    "• без параметра или since — заказы с прошлой такой выгрузки (первый раз — за сутки), "
+    "кроме созданных в последнюю минуту — они попадут в следующую\n"
+    "• day, week — за последние сутки или неделю\n"
+    "• 2026-10-01 или 2026-10-01..2026-10-15 — за дни включительно\n"
+    "• all — все заказы"
+)
+
+EXPORT_PERIODS = {
+    'day': timedelta(days=1),
+    'week': timedelta(days=7),
+}
+
+# отметка since-выгрузки отстает от текущего момента: заказ, чья транзакция еще не завершилась,
+# получает created_at раньше фиксации и без запаса оказался бы до отметки, так и не попав в выгрузку
+EXPORT_COMMIT_LAG = timedelta(minutes=1)
+
+
+# параметры выгрузки из аргументов команды
+# период since - выгрузка с отметки прошлой инкрементальной выгрузки, отметка сдвигается после отправки
+@dataclass
+class OrderExport:
+    period: str = 'since'
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    is_paid: Optional[bool] = None
+
+    @property
+    def since_last(self) -> bool:
+        return self.period == 'since'
+
+    # ключ кэша: скользящие окна округляются до минуты, поэтому в течение минуты отчет тот же,
+    # а заказы, вышедшие из окна, в переиспользованный отчет не попадают
+    @property
+    def cache_key(self):
+        return self.period, self.date_from, self.date_to, self.is_paid
+
+
+def _floor_minute(value: datetime) -> datetime:
+    return value.replace(second=0, microsecond=0)
+
+
+def _day_start(value: str) -> datetime:
+    day = datetime.strptime(value, "%Y-%m-%d").date()
+    return timezone.make_aware(datetime.combine(day, time.min))
+
 
-# команда для выгрузки всех заказов в Excel файл
-# создает таблицу с информацией о заказах, включая данные покупателя и товары
-# автоматически настраивает ширину столбцов и отправляет файл администратору
+def parse_export_args(args: str, now: datetime) -> OrderExport:
+    export = OrderExport()
+    for token in (args or "").lower().split():
+        if token in ('paid', 'unpaid'):
+            export.is_paid = token == 'paid'
+        elif token in ('since', 'all'):
+            export.period = token
+            export.date_from = export.date_to = None
+        elif token in EXPORT_PERIODS:
+            export.period = token
+            export.date_from, export.date_to = _floor_minute(now - EXPORT_PERIODS[token]), None
+        else:
+            first, _, last = token.partition('..')
+            export.period = 'range'
+            export.date_from = _day_start(first)
+            export.date_to = _day_start(last or first) + timedelta(days=1)
+    return export
+
+
+def _describe_export(export: OrderExport) -> str:
+    if export.date_from is None and export.date_to is None:
+        period = "все заказы"
+    else:
+        start = timezone.localtime(export.date_from).strftime("%d.%m.%Y %H:%M") if export.date_from else "начала"
+        end = timezone.localtime(export.date_to).strftime("%d.%m.%Y %H:%M") if export.date_to else "сейчас"
+        period = f"заказы с {start} по {end}"
+    if export.is_paid is not None:
+        period += ", только оплаченные" if export.is_paid else ", только неоплаченные"
+    return period
+
+
+# команда для выгрузки заказов в Excel файл
+# отчет строится в пуле процессов, администратор сразу получает ответ, а файл - когда будет готов
 @router.message(Command("admin_xlsx"))
-async def handle_admin_xlsx(message: Message):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Заказы"
-
-    # Заголовки
-    headers = [
-        "ID заказа", 
-        "Дата заказа",
-        "ФИО получателя",
-        "Телефон",
-        "Адрес",
-        "Статус оплаты",
-        "Telegram ID",
-        "Username",
-        "Товары"
-    ]
-    for col, header in enumerate(headers, 1):
-        ws.cell(row=1, column=col, value=header)
-
-    row = 2
-    async for order in Order.objects.select_related('user').prefetch_related('items__product__subcategory').all():
-        items_info = []
-        async for item in order.items.all():
-            items_info.append(f"{item.product.subcategory.name} x {item.quantity}")
-        items_str = ", ".join(items_info)
-
-        row_data = [
-            order.id,
-            order.created_at.strftime("%d.%m.%Y %H:%M"),
-            order.full_name,
-            order.phone_number,
-            order.address,
-            "Оплачен" if order.is_paid else "Не оплачен",
-            order.user.telegram_id,
-            order.user.username or "Нет username",
-            items_str
-        ]
-        
-        for col, value in enumerate(row_data, 1):
-            ws.cell(row=row, column=col, value=value)
-        row += 1
-
-    for column in ws.columns:
-        max_length = 0
-        column_letter = openpyxl.utils.get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column_letter].width = adjusted_width
-
-    filename = f"orders_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    filepath = f"media/{filename}"
-    wb.save(filepath)
-    document = FSInputFile(filepath)
-    await message.answer_document(
-        document=document,
-        caption="Отчет по всем заказам"
-    )
+async def handle_admin_xlsx(message: Message, command: CommandObject):
+    now = timezone.now()
+    try:
+        export = parse_export_args(command.args, now)
+    except ValueError:
+        await message.answer(EXPORT_HELP)
+        return
+
+    if export.since_last:
+        watermark = await ExportWatermark.objects.filter(
+            admin_id=message.from_user.id
+        ).values_list('exported_until', flat=True).afirst()
+        export.date_to = _floor_minute(now - EXPORT_COMMIT_LAG)
+        export.date_from = watermark or export.date_to - EXPORT_PERIODS['day']
+
+    await message.answer(f"⏳ Отчет готовится ({_describe_export(export)}), пришлю файл, когда он будет готов.")
+    task = asyncio.create_task(_send_orders_report(message, export))
+    _report_tasks.add(task)
+    task.add_done_callback(_report_tasks.discard)
+
 
-    os.remove(filepath)
+# версия данных для кэша отчетов: число заказов и время последнего изменения (по индексу updated_at)
+# число меняется и при удалении заказов, которое не сдвигает updated_at
+async def _orders_version():
+    version = await Order.objects.aaggregate(count=Count('id'), updated=Max('updated_at'))
+    return version['count'], version['updated']
+
+
+# отчет берется из кэша, пока заказы не менялись; одинаковые запросы строят его один раз
+async def _send_orders_report(message: Message, export: OrderExport):
+    description = _describe_export(export)
+    try:
+        version = await _orders_version()
+        cached = report_cache.get(export.cache_key, version)
+        if cached is not None:
+            file_id, count = cached
+            document = file_id
+        else:
+            data, count = await report_cache.single_flight(
+                export.cache_key,
+                lambda: run_report(build_orders_xlsx, export.date_from, export.date_to, export.is_paid),
+            )
+            filename = f"orders_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+            document = BufferedInputFile(data, filename=filename) if count else None
+
+        if count:
+            sent = await message.answer_document(
+                document=document,
+                caption=f"Отчет: {description}, заказов: {count}"
+            )
+            report_cache.remember(export.cache_key, version, sent.document.file_id, count)
+        else:
+            await message.answer(f"Заказов нет: {description}.")
+            report_cache.remember(export.cache_key, version, None, 0)
+    except Exception as e:
+        logger.error(f"Ошибка построения отчета по заказам: {e}")
+        await message.answer("Не удалось построить отчет, попробуйте позже.")
+        return
+
+    if export.since_last:
+        await ExportWatermark.objects.aupdate_or_create(
+            admin_id=message.from_user.id,
+            defaults={'exported_until': export.date_to},
+        )
+
+
+# счетчики событий, отброшенных ограничением частоты
+# проверка администратора стоит и на самой команде: статистика не должна открыться, если роутер подключат без фильтра
+@router.message(Command("admin_stats"), F.from_user.id.in_(ADMIN_IDS))
+async def handle_admin_stats(message: Message, throttling: ThrottlingMiddleware):
+    stats = throttling.stats
+    await message.answer(
+        "📊 Отброшено ограничением частоты:\n"
+        f"• повторные нажатия: {stats['duplicate_callbacks']}\n"
+        f"• нажатия сверх лимита: {stats['throttled_callbacks']}\n"
+        f"• сообщения сверх лимита: {stats['throttled_messages']}"
+    )
@@ -1,105 +1,169 @@
-from aiogram import Router, F
+from aiogram import Router, html
 from aiogram.types import Message, CallbackQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.fsm.context import FSMContext
-from decimal import Decimal
+from aiogram.exceptions import TelegramBadRequest
+from django.db import IntegrityError
 
-from bot.models import CartItem, TelegramUser, Product
+from bot.models import CartItem, TelegramUser
+from bot.services.cart import add_to_cart, cart_page, cart_totals, decrement_cart_item
+from tg_bot import callbacks as cb
+from tg_bot.callbacks import callbacks
 
 router = Router()
 
-# показывает содержимое корзины пользователя
-@router.callback_query(F.data == "view_cart")
-async def show_cart(query: CallbackQuery):
-    user_obj, _ = await TelegramUser.objects.aget_or_create(telegram_id=query.from_user.id)
-    cart_items = [
-        item async for item in CartItem.objects.filter(user=user_obj).select_related('product')
+# позиций на странице корзины
+CART_PAGE_SIZE = 5
+# позиций в сводке перед оформлением заказа, остальные показываются числом
+SUMMARY_ITEMS_LIMIT = 10
+# длина описания товара в корзине и сводках
+DESCRIPTION_LIMIT = 80
+
+
+# описание в одну строку; из базы приходит на символ больше лимита, чтобы понять, что оно обрезано
+def _short_description(text, limit=DESCRIPTION_LIMIT):
+    short = " ".join(text.split())
+    if len(text) > limit or len(short) > limit:
+        short = short[:limit - 1].rstrip() + "…"
+    return html.quote(short)
+
+
+# сводка корзины для подтверждения заказа: первые позиции и итог, без загрузки всей корзины
+async def build_cart_summary(user_id: int):
+    positions, units = await cart_totals(user_id)
+    if not positions:
+        return None
+
+    lines = [
+        f"• {_short_description(line.description)} - {line.quantity} шт."
+        for line in await cart_page(user_id, 0, SUMMARY_ITEMS_LIMIT, DESCRIPTION_LIMIT)
     ]
-    
-    if not cart_items:
-        builder = InlineKeyboardBuilder()
-        builder.button(text="В каталог", callback_data="show_catalog")
+    if positions > SUMMARY_ITEMS_LIMIT:
+        lines.append(f"… и еще позиций: {positions - SUMMARY_ITEMS_LIMIT}")
+    lines.append(f"\nВсего: {positions} поз., {units} шт.")
+    return "\n".join(lines)
+
+
+def _empty_cart_keyboard():
+    builder = InlineKeyboardBuilder()
+    builder.button(text="В каталог", callback_data=cb.SHOW_CATALOG.pack())
+    return builder.as_markup()
+
+
+# показывает страницу корзины пользователя
+async def render_cart(query: CallbackQuery, user_obj: TelegramUser, page: int = 0, notice: str = None):
+    positions, units = await cart_totals(user_obj.id)
+    if not positions:
         await query.message.edit_text(
             "Ваша корзина пуста. Выберите товары в каталоге.",
-            reply_markup=builder.as_markup()
+            reply_markup=_empty_cart_keyboard()
         )
-        await query.answer()
-        return
+        return query.answer(notice)
+
+    # после удаления позиций страница могла исчезнуть - показываем последнюю
+    pages = (positions + CART_PAGE_SIZE - 1) // CART_PAGE_SIZE
+    page = min(page, pages - 1)
+    offset = page * CART_PAGE_SIZE
+    lines = await cart_page(user_obj.id, offset, CART_PAGE_SIZE, DESCRIPTION_LIMIT)
 
-    message_text = "🛒 Ваша корзина:\n\n"
+    message_text = f"🛒 Ваша корзина ({positions} поз., {units} шт.):\n\n"
     builder = InlineKeyboardBuilder()
-    
-    for idx, item in enumerate(cart_items, 1):
-        product = item.product
-        message_text += f"{idx}. {product.description}\n"
-        message_text += f"   Количество: {item.quantity} шт.\n\n"
-        builder.button(
-            text=f"❌ Удалить {idx}",
-            callback_data=f"remove_from_cart:{product.id}"
-        )
-    
-    builder.adjust(2)
-    builder.row()
-    
-    builder.button(text="Очистить корзину", callback_data="clear_cart")
-    builder.button(text="Оформить заказ", callback_data="checkout")
-    builder.adjust(1)
-    builder.row()
-    builder.button(text="В каталог", callback_data="show_catalog")
-    
-    await query.message.edit_text(message_text, reply_markup=builder.as_markup())
-    await query.answer()
+    for idx, line in enumerate(lines, offset + 1):
+        message_text += f"{idx}. {_short_description(line.description)}\n"
+        message_text += f"   Количество: {line.quantity} шт.\n\n"
+        builder.button(text=f"➖ {idx}", callback_data=cb.CART_DECREASE.pack(line.product_id, page))
+        builder.button(text=f"➕ {idx}", callback_data=cb.CART_INCREASE.pack(line.product_id, page))
+        builder.button(text=f"❌ {idx}", callback_data=cb.REMOVE_FROM_CART.pack(line.product_id, page))
+    builder.adjust(3)
+
+    if pages > 1:
+        nav = InlineKeyboardBuilder()
+        if page > 0:
+            nav.button(text="◀️", callback_data=cb.CART_PAGE.pack(page - 1))
+        nav.button(text=f"{page + 1}/{pages}", callback_data=cb.CART_PAGE.pack(page))
+        if page < pages - 1:
+            nav.button(text="▶️", callback_data=cb.CART_PAGE.pack(page + 1))
+        builder.attach(nav)
+
+    actions = InlineKeyboardBuilder()
+    actions.button(text="Очистить корзину", callback_data=cb.CLEAR_CART.pack())
+    actions.button(text="Оформить заказ", callback_data=cb.CHECKOUT.pack())
+    actions.button(text="В каталог", callback_data=cb.SHOW_CATALOG.pack())
+    actions.adjust(1)
+    builder.attach(actions)
+
+    try:
+        await query.message.edit_text(message_text, reply_markup=builder.as_markup())
+    except TelegramBadRequest as e:
+        # повторное нажатие на ту же страницу
+        if "message is not modified" not in str(e):
+            raise
+    return query.answer(notice)
+
+
+@callbacks.handler(cb.VIEW_CART)
+async def show_cart(query: CallbackQuery, user_obj: TelegramUser):
+    return await render_cart(query, user_obj)
+
+
+@callbacks.handler(cb.CART_PAGE)
+async def show_cart_page(query: CallbackQuery, user_obj: TelegramUser, page: int):
+    return await render_cart(query, user_obj, page)
+
+
+# изменение количества прямо из корзины, каждое - одним запросом
+@callbacks.handler(cb.CART_INCREASE)
+async def increase_quantity(query: CallbackQuery, user_obj: TelegramUser, product_id: int, page: int):
+    try:
+        await add_to_cart(user_obj.id, product_id)
+    except IntegrityError:
+        return await render_cart(query, user_obj, page, notice="Этот товар больше недоступен.")
+    return await render_cart(query, user_obj, page)
+
+
+@callbacks.handler(cb.CART_DECREASE)
+async def decrease_quantity(query: CallbackQuery, user_obj: TelegramUser, product_id: int, page: int):
+    await decrement_cart_item(user_obj.id, product_id)
+    return await render_cart(query, user_obj, page)
 
 
 # очищаем всю корзину пользователя
-@router.callback_query(F.data == "clear_cart")
-async def clear_cart(query: CallbackQuery):
-    user_obj, _ = await TelegramUser.objects.aget_or_create(telegram_id=query.from_user.id)
+@callbacks.handler(cb.CLEAR_CART)
+async def clear_cart(query: CallbackQuery, user_obj: TelegramUser):
     await CartItem.objects.filter(user=user_obj).adelete()
-    
-    builder = InlineKeyboardBuilder()
-    builder.button(text="В каталог", callback_data="show_catalog")
-    
+
     await query.message.edit_text(
         "Корзина очищена!",
-        reply_markup=builder.as_markup()
+        reply_markup=_empty_cart_keyboard()
     )
-    await query.answer()
+    return query.answer()
 
 
 # удаление конкретного товара из корзины
-@router.callback_query(F.data.startswith("remove_from_cart:"))
-async def remove_from_cart(query: CallbackQuery):
-    product_id = int(query.data.split(":")[1])
-    user_obj, _ = await TelegramUser.objects.aget_or_create(telegram_id=query.from_user.id)
+@callbacks.handler(cb.REMOVE_FROM_CART)
+async def remove_from_cart(query: CallbackQuery, user_obj: TelegramUser, product_id: int, page: int):
     await CartItem.objects.filter(user=user_obj, product_id=product_id).adelete()
-    await show_cart(query)
+    return await render_cart(query, user_obj, page)
 
 
 # процесс оформления заказа
-@router.callback_query(F.data == "checkout")
-async def start_checkout(query: CallbackQuery, state: FSMContext):
-    user_obj, _ = await TelegramUser.objects.aget_or_create(telegram_id=query.from_user.id)
-    cart_items = [
-        item async for item in CartItem.objects.filter(user=user_obj).select_related('product')
-    ]
-    
-    if not cart_items:
+@callbacks.handler(cb.CHECKOUT)
+async def start_checkout(query: CallbackQuery, state: FSMContext, user_obj: TelegramUser):
+    summary = await build_cart_summary(user_obj.id)
+    if summary is None:
         await query.answer("Корзина пуста!", show_alert=True)
         return
 
     message_text = "📋 Подтверждение заказа\n\n"
     message_text += "Товары в заказе:\n"
-    
-    for item in cart_items:
-        message_text += f"• {item.product.description} - {item.quantity} шт.\n"
-    
+    message_text += summary
+
     builder = InlineKeyboardBuilder()
-    builder.button(text="Подтвердить", callback_data="confirm_order")
-    builder.button(text="Отмена", callback_data="view_cart")
-    
+    builder.button(text="Подтвердить", callback_data=cb.CONFIRM_ORDER.pack())
+    builder.button(text="Отмена", callback_data=cb.VIEW_CART.pack())
+
     await query.message.edit_text(
         message_text,
         reply_markup=builder.as_markup()
     )
-    await query.answer()
\ No newline at end of file
+    return query.answer()
@@ -1,71 +1,68 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
-from aiogram.utils.keyboard import InlineKeyboardBuilder, InlineKeyboardButton
-from bot.models import Category, Subcategory
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from tg_bot import callbacks as cb
+from tg_bot.callbacks import callbacks
+from tg_bot.catalog_cache import catalog_cache
 
 router = Router()
 
-# показ категорий
-@router.callback_query(F.data == "show_catalog")
-async def show_categories(query: CallbackQuery):
-    categories = [cat async for cat in Category.objects.all()]
-    if not categories:
-        await query.answer("Категорий пока нет.", show_alert=True)
-        return
-
+# создание клавиатуры для списка категорий
+def build_categories_keyboard(categories):
     builder = InlineKeyboardBuilder()
     builder.row_width = 2
     for cat in categories:
         builder.button(
             text=cat.name,
-            callback_data=f"category:{cat.id}"
+            callback_data=cb.CATEGORY.pack(cat.id)
         )
+    return builder.as_markup()
+
+# создание клавиатуры для списка подкатегорий
+def build_subcategory_keyboard(subcats, add_back_button=True):
+    builder = InlineKeyboardBuilder()
+    builder.row_width = 2
+    for sub in subcats:
+        builder.button(text=sub.name, callback_data=cb.SUBCATEGORY.pack(sub.id))
+    if add_back_button:
+        builder.button(text="Назад", callback_data=cb.BACK_TO_CATEGORIES.pack())
+    return builder.as_markup()
+
+# начало навигации по каталогу текстом
+@router.message(F.text == "Каталог")
+async def show_categories_message(message: Message):
+    categories = await catalog_cache.categories()
+    if not categories:
+        await message.answer("Категорий пока нет.")
+        return
+
+    await message.answer("Выберите категорию:", reply_markup=build_categories_keyboard(categories))
+
+# показ категорий
+@callbacks.handler(cb.SHOW_CATALOG)
+async def show_categories(query: CallbackQuery):
+    categories = await catalog_cache.categories()
+    if not categories:
+        await query.answer("Категорий пока нет.", show_alert=True)
+        return
 
-    keyboard = builder.as_markup()
+    keyboard = build_categories_keyboard(categories)
     await query.message.edit_text("Выберите категорию:", reply_markup=keyboard)
-    await query.answer()
+    return query.answer()
 
 # показ подкатегорий
-@router.callback_query(F.data.startswith("category:"))
-async def choose_subcategory(query: CallbackQuery):
-    category_id = int(query.data.split(":", 1)[1])
-    subcats = [sub async for sub in Subcategory.objects.filter(category_id=category_id)]
+@callbacks.handler(cb.CATEGORY)
+async def choose_subcategory(query: CallbackQuery, category_id: int):
+    subcats = await catalog_cache.subcategories(category_id)
     if not subcats:
         await query.answer("Подкатегорий пока нет.", show_alert=True)
         return
 
-    builder = InlineKeyboardBuilder()
-    builder.row_width = 2
-    for sub in subcats:
-        builder.button(
-            text=sub.name,
-            callback_data=f"subcategory:{sub.id}"
-        )
-    builder.button(
-        text="Назад",
-        callback_data="back_to_categories"
-    )
-
-    keyboard = builder.as_markup()
+    keyboard = build_subcategory_keyboard(subcats)
     await query.message.edit_text("Выберите подкатегорию:", reply_markup=keyboard)
-    await query.answer()
+    return query.answer()
 
 # возврат к категориям
-@router.callback_query(F.data == "back_to_categories")
+@callbacks.handler(cb.BACK_TO_CATEGORIES)
 async def back_to_categories(query: CallbackQuery):
-    categories = [cat async for cat in Category.objects.all()]
-    if not categories:
-        await query.answer("Категорий пока нет.", show_alert=True)
-        return
-
-    builder = InlineKeyboardBuilder()
-    builder.row_width = 2
-    for cat in categories:
-        builder.button(
-            text=cat.name,
-            callback_data=f"category:{cat.id}"
-        )
-
-    keyboard = builder.as_markup()
-    await query.message.edit_text("Выберите категорию:", reply_markup=keyboard)
-    await query.answer()
+    return await show_categories(query)
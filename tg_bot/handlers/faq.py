@@ -1,4 +1,4 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import InlineQuery, InlineQueryResultArticle, InputTextMessageContent
 from aiogram.types import CallbackQuery, InlineKeyboardButton
 from aiogram.utils.markdown import hbold
@@ -6,6 +6,8 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 import hashlib
 
 from bot.models import TelegramUser, CartItem
+from tg_bot import callbacks as cb
+from tg_bot.callbacks import callbacks
 
 router = Router()
 
@@ -20,6 +22,9 @@ faq_database = {
     "скидки": "🏷️ У нас действует система скидок: \n- от 5000₽ - скидка 5%\n- от 10000₽ - скидка 10%",
 }
 
+# порядок тем задает номер темы в callback_data
+faq_topics = list(faq_database)
+
 topic_emoji = {
     "доставка": "🚚",
     "оплата": "💳",
@@ -70,66 +75,69 @@ async def faq_inline_handler(inline_query: InlineQuery):
     
     await inline_query.answer(results, cache_time=300)
 
-@router.callback_query(F.data == "show_faq")
+@callbacks.handler(cb.SHOW_FAQ)
 async def show_faq_menu(callback: CallbackQuery):
     text = "❓ Выберите интересующую вас тему:"
     
     builder = InlineKeyboardBuilder()
     
-    for topic in faq_database.keys():
+    for index, topic in enumerate(faq_topics):
         builder.button(
             text=f"{topic_emoji.get(topic, '❓')} {topic.capitalize()}", 
-            callback_data=f"faq:{topic}"
+            callback_data=cb.FAQ_TOPIC.pack(index)
         )
     
-    builder.row(InlineKeyboardButton(text="« Назад", callback_data="back_to_start"))
+    builder.row(InlineKeyboardButton(text="« Назад", callback_data=cb.BACK_TO_START.pack()))
     builder.adjust(1)
     
     await callback.message.edit_text(
         text,
         reply_markup=builder.as_markup()
     )
-    await callback.answer()
+    return callback.answer()
 
-@router.callback_query(F.data.startswith("faq:"))
-async def show_faq_answer(callback: CallbackQuery):
-    topic = callback.data.replace("faq:", "")
+@callbacks.handler(cb.FAQ_TOPIC)
+async def show_faq_answer(callback: CallbackQuery, topic_index: int):
+    if topic_index >= len(faq_topics):
+        await callback.answer()
+        return
+    topic = faq_topics[topic_index]
     
     answer_text = f"{topic_emoji.get(topic, '❓')} {topic.capitalize()}\n\n"
     answer_text += faq_database[topic]
     
     builder = InlineKeyboardBuilder()
     
-    for other_topic in faq_database.keys():
+    for index, other_topic in enumerate(faq_topics):
         if other_topic != topic:
             builder.button(
                 text=f"{topic_emoji.get(other_topic, '❓')} {other_topic.capitalize()}", 
-                callback_data=f"faq:{other_topic}"
+                callback_data=cb.FAQ_TOPIC.pack(index)
             )
     
-    builder.row(InlineKeyboardButton(text="« Назад", callback_data="back_to_start"))
+    builder.row(InlineKeyboardButton(text="« Назад", callback_data=cb.BACK_TO_START.pack()))
     builder.adjust(1)
     
     await callback.message.edit_text(
         answer_text,
         reply_markup=builder.as_markup()
     )
-    await callback.answer()
+    return callback.answer()
 
-@router.callback_query(F.data == "back_to_start")
-async def back_to_start(callback: CallbackQuery):
+@callbacks.handler(cb.BACK_TO_START)
+async def back_to_start(callback: CallbackQuery, user_obj: TelegramUser):
     user = callback.from_user
     text = f"🔄 С возвращением, {user.first_name}!"
     
     builder = InlineKeyboardBuilder()
-    builder.button(text="Каталог", callback_data="show_catalog")
-    builder.button(text="FAQ", callback_data="show_faq")
+    builder.button(text="Каталог", callback_data=cb.SHOW_CATALOG.pack())
+    builder.button(text="FAQ", callback_data=cb.SHOW_FAQ.pack())
     builder.adjust(2)
+    builder.row(InlineKeyboardButton(text="🔍 Поиск", switch_inline_query_current_chat=""))
     
-    user_obj, _ = await TelegramUser.objects.aget_or_create(telegram_id=user.id)
     has_cart_items = await CartItem.objects.filter(user=user_obj).aexists()
     if has_cart_items:
-        builder.row(InlineKeyboardButton(text="Корзина", callback_data="view_cart"))
+        builder.row(InlineKeyboardButton(text="Корзина", callback_data=cb.VIEW_CART.pack()))
     
     await callback.message.edit_text(
         text,
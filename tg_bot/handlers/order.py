@@ -1,20 +1,28 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardRemove
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-import os
-import uuid
-from yookassa import Configuration, Payment
+import logging
+from decimal import Decimal
 
-from bot.models import CartItem, Order, OrderItem, TelegramUser
+from django.utils import timezone
 
-# Инициализация ЮKassa
-Configuration.account_id = os.getenv('YOOKASSA_SHOP_ID')
-Configuration.secret_key = os.getenv('YOOKASSA_SECRET_KEY')
+from bot.models import Order, TelegramUser
+from bot.services.orders import aplace_order
+from bot.services.payments import PaymentError, YooKassaGateway
+from tg_bot import callbacks as cb
+from tg_bot.callbacks import callbacks
+from tg_bot.handlers.cart import build_cart_summary
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
+# сумма тестового заказа и адрес возврата после оплаты
+ORDER_AMOUNT = Decimal("199.00")
+PAYMENT_RETURN_URL = "https://t.me/shoooptest_bot"
+
 
 class OrderStates(StatesGroup):
     waiting_for_name = State()
@@ -23,7 +31,7 @@ class OrderStates(StatesGroup):
     waiting_for_confirmation = State()
 
 # процесс сбора инфы для заказа
-@router.callback_query(F.data == "confirm_order")
+@callbacks.handler(cb.CONFIRM_ORDER)
 async def start_order(query: CallbackQuery, state: FSMContext):
     await state.clear()
     await query.message.answer(
@@ -31,7 +39,7 @@ async def start_order(query: CallbackQuery, state: FSMContext):
         reply_markup=ReplyKeyboardRemove()
     )
     await state.set_state(OrderStates.waiting_for_name)
-    await query.answer()
+    return query.answer()
 
 
 @router.message(OrderStates.waiting_for_name)
@@ -59,7 +67,7 @@ async def process_phone(message: Message, state: FSMContext):
 
 # подтверждение и тд 
 @router.message(OrderStates.waiting_for_address)
-async def process_address(message: Message, state: FSMContext):
+async def process_address(message: Message, state: FSMContext, user_obj: TelegramUser):
     if len(message.text) < 10:
         await message.answer("Адрес слишком короткий. Пожалуйста, укажите полный адрес доставки:")
         return
@@ -67,70 +75,69 @@ async def process_address(message: Message, state: FSMContext):
     await state.update_data(address=message.text)
     data = await state.get_data()
 
-    user_obj, _ = await TelegramUser.objects.aget_or_create(telegram_id=message.from_user.id)
-    cart_items = [
-        item async for item in CartItem.objects.filter(user=user_obj).select_related('product')
-    ]
+    summary = await build_cart_summary(user_obj.id)
+    if summary is None:
+        await state.clear()
+        await message.answer("Корзина пуста, оформлять нечего.")
+        return
 
     message_text = "📋 Подтвердите данные заказа:\n\n"
     message_text += f"👤 ФИО: {data['full_name']}\n"
     message_text += f"📞 Телефон: {data['phone_number']}\n"
     message_text += f"📍 Адрес: {data['address']}\n\n"
     message_text += "Товары:\n"
-
-    for item in cart_items:
-        message_text += f"• {item.product.description} - {item.quantity} шт.\n"
+    message_text += summary
 
     builder = InlineKeyboardBuilder()
-    builder.button(text="✅ Подтвердить заказ", callback_data="complete_order")
-    builder.button(text="❌ Отменить", callback_data="cancel_order")
+    builder.button(text="✅ Подтвердить заказ", callback_data=cb.COMPLETE_ORDER.pack())
+    builder.button(text="❌ Отменить", callback_data=cb.CANCEL_ORDER.pack())
     builder.adjust(1)
 
     await message.answer(message_text, reply_markup=builder.as_markup())
     await state.set_state(OrderStates.waiting_for_confirmation)
 
 
-@router.callback_query(F.data == "complete_order")
-async def complete_order(query: CallbackQuery, state: FSMContext):
+@callbacks.handler(cb.COMPLETE_ORDER)
+async def complete_order(query: CallbackQuery, state: FSMContext, user_obj: TelegramUser, payments: YooKassaGateway):
     data = await state.get_data()
-    user_obj, _ = await TelegramUser.objects.aget_or_create(telegram_id=query.from_user.id)
-    cart_items = [item async for item in CartItem.objects.filter(user=user_obj).select_related('product')]
-
-    order = await Order.objects.acreate(
-        user=user_obj,
+    order = await aplace_order(
+        user_obj.id,
         full_name=data['full_name'],
         phone_number=data['phone_number'],
         address=data['address']
     )
+    if order is None:
+        await state.clear()
+        await query.answer("Корзина пуста!", show_alert=True)
+        return
 
-    for cart_item in cart_items:
-        await OrderItem.objects.acreate(
-            order=order,
-            product=cart_item.product,
-            quantity=cart_item.quantity
+    # ключ идемпотентности привязан к заказу: повторы запроса не создадут второй платеж
+    try:
+        payment = await payments.create_payment(
+            amount=ORDER_AMOUNT,
+            description=f"Тестовый заказ #{order.id}",
+            return_url=PAYMENT_RETURN_URL,
+            metadata={"order_id": order.id},
+            idempotence_key=f"order-{order.id}",
+        )
+    except PaymentError as e:
+        logger.error(f"Не удалось создать платеж для заказа #{order.id}: {e}")
+        await state.clear()
+        await query.message.edit_text(
+            f"Заказ #{order.id} создан, но платеж сейчас недоступен. Мы свяжемся с вами для оплаты."
         )
+        return query.answer()
+
+    # оплату подтвердит уведомление ЮKassa или сверка платежей
+    await Order.objects.filter(id=order.id).aupdate(
+        payment_id=payment.id, payment_status=payment.status, updated_at=timezone.now()
+    )
 
-    payment = Payment.create({
-        "amount": {
-            "value": "199.00",
-            "currency": "RUB"
-        },
-        "confirmation": {
-            "type": "redirect",
-            "return_url": f"https://t.me/shoooptest_bot"
-        },
-        "capture": True,
-        "description": f"Тестовый заказ #{order.id}"
-    })
-
-    await Order.objects.filter(id=order.id).aupdate(is_paid=True)
-
-    await CartItem.objects.filter(user=user_obj).adelete()
     await state.clear()
     builder = InlineKeyboardBuilder()
     builder.button(
         text="💳 Перейти к оплате",
-        url=payment.confirmation.confirmation_url
+        url=payment.confirmation_url
     )
 
     await query.message.edit_text(
@@ -141,27 +148,26 @@ async def complete_order(query: CallbackQuery, state: FSMContext):
     await query.answer()
 
     builder = InlineKeyboardBuilder()
-    builder.button(text="В каталог", callback_data="show_catalog")
+    builder.button(text="В каталог", callback_data=cb.SHOW_CATALOG.pack())
 
     await query.message.answer(
-        f"✅ Заказ #{order.id} успешно оплачен!\n\n"
-        f"📦 Статус: Заказ оформлен и оплачен\n"
+        f"📦 Заказ #{order.id} оформлен и ожидает оплаты\n"
         f"👤 Получатель: {data['full_name']}\n"
         f"📞 Телефон: {data['phone_number']}\n"
         f"📍 Адрес доставки: {data['address']}\n\n"
-        "Спасибо за покупку! Мы свяжемся с вами для уточнения деталей доставки.",
+        "Как только оплата пройдет, мы пришлем подтверждение.",
         reply_markup=builder.as_markup()
     )
 
 
-@router.callback_query(F.data == "cancel_order")
+@callbacks.handler(cb.CANCEL_ORDER)
 async def cancel_order(query: CallbackQuery, state: FSMContext):
     await state.clear()
     builder = InlineKeyboardBuilder()
-    builder.button(text="Вернуться в корзину", callback_data="view_cart")
+    builder.button(text="Вернуться в корзину", callback_data=cb.VIEW_CART.pack())
 
     await query.message.edit_text(
         "❌ Оформление заказа отменено",
         reply_markup=builder.as_markup()
     )
-    await query.answer()
+    return query.answer()
@@ -1,28 +1,80 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardRemove, FSInputFile, InputMediaPhoto
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 import os
-from typing import Union
-
-from bot.models import Category, Subcategory, Product, CartItem, TelegramUser
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Union
+
+from django.db import IntegrityError
+from django.db.models import Q
+
+from bot.models import Product, TelegramUser
+from bot.services.cart import add_to_cart
+from tg_bot import callbacks as cb
+from tg_bot.callbacks import callbacks
+from tg_bot.catalog_cache import catalog_cache
+from tg_bot.handlers.catalog import build_categories_keyboard, build_subcategory_keyboard
+from tg_bot.prefetch import neighbour_prefetch
 from aiogram.exceptions import TelegramBadRequest
 
 router = Router()
 
+# сколько товаров подкатегории считаем точно, дальше показываем "N+"
+PRODUCT_COUNT_LIMIT = 1000
+
 class ProductStates(StatesGroup):
     waiting_for_quantity = State() 
     waiting_for_confirmation = State()
 
+# файл фото, который уходит в телеграм: оптимизированная копия, если она уже готова
+def _product_photo_file(product):
+    if product.has_image_derivatives and product.image_telegram:
+        return product.image_telegram
+    return product.image
+
+# file_id текущей версии фото товара, если телеграм ее уже видел
+def cached_photo_file_id(product):
+    if product.image and product.image_file_id:
+        if product.image_file_id_source == _product_photo_file(product).name:
+            return product.image_file_id
+    return None
+
 # подготовка фотографии товара для отправки
+# если телеграм уже знает эту версию фото, отправляем его file_id вместо файла
 def prepare_product_photo(product):
     if product.image:
-        image_path = os.path.join('media', product.image.name)
+        file_id = cached_photo_file_id(product)
+        if file_id:
+            return file_id
+        image_path = os.path.join('media', _product_photo_file(product).name)
         if os.path.exists(image_path):
             return FSInputFile(image_path)
     return None
 
+# запоминаем file_id, который телеграм выдал после загрузки фото
+async def _remember_photo_file_id(product, sent_message):
+    if not isinstance(sent_message, Message) or not sent_message.photo:
+        return
+    file_id = sent_message.photo[-1].file_id
+    if file_id == product.image_file_id:
+        return
+    source_name = _product_photo_file(product).name
+    product.image_file_id = file_id
+    product.image_file_id_source = source_name
+    await Product.objects.filter(id=product.id).aupdate(
+        image_file_id=file_id,
+        image_file_id_source=source_name
+    )
+
+# сброс file_id, который телеграм перестал принимать
+async def _forget_photo_file_id(product):
+    product.image_file_id = ''
+    product.image_file_id_source = ''
+    await Product.objects.filter(id=product.id).aupdate(image_file_id='', image_file_id_source='')
+
 # удаление сообщения с обработкой ошибок
 async def _try_delete_message(message):
     try:
@@ -41,191 +93,263 @@ async def _try_edit_message(message, text=None, reply_markup=None, media=None):
     except TelegramBadRequest:
         return False
 
-# отправка или обновление сообщения с информацией о товаре
-async def _send_product_message(message_or_query, product, keyboard, is_edit=False):
-    caption = f"<b>{product.subcategory.name}</b>\n\n{product.description}"
-    photo = prepare_product_photo(product)
-
+# отправка или замена фото товара, возвращает сообщение с фото
+async def _send_product_photo(message_or_query, photo, caption, keyboard):
     if isinstance(message_or_query, Message):
-        if photo:
-            await message_or_query.answer_photo(photo=photo, caption=caption, reply_markup=keyboard)
-        else:
-            await message_or_query.answer(text=f"🖼 [Фото отсутствует]\n\n{caption}", reply_markup=keyboard)
-        return
+        return await message_or_query.answer_photo(photo=photo, caption=caption, reply_markup=keyboard)
 
-    if photo:
-        if message_or_query.message.photo:
-            success = await _try_edit_message(
-                message_or_query.message,
+    if message_or_query.message.photo:
+        try:
+            return await message_or_query.message.edit_media(
                 media=InputMediaPhoto(media=photo, caption=caption),
                 reply_markup=keyboard
             )
-            if success:
-                return
+        except TelegramBadRequest:
+            pass
+
+    await _try_delete_message(message_or_query.message)
+    return await message_or_query.bot.send_photo(
+        chat_id=message_or_query.message.chat.id,
+        photo=photo,
+        caption=caption,
+        reply_markup=keyboard
+    )
+
+# подпись карточки товара с позицией в подкатегории
+def build_product_caption(product, position=None):
+    caption = f"<b>{product.subcategory.name}</b>\n\n{product.description}"
+    if position:
+        caption += f"\n\n<i>{position}</i>"
+    return caption
+
+# отправка или обновление сообщения с информацией о товаре
+async def _send_product_message(message_or_query, product, keyboard, caption=None):
+    caption = caption or build_product_caption(product)
+    photo = prepare_product_photo(product)
+
+    if isinstance(photo, str):
+        try:
+            await _send_product_photo(message_or_query, photo, caption, keyboard)
+            return
+        except TelegramBadRequest:
+            # сохраненный file_id отклонен - загружаем файл заново
+            await _forget_photo_file_id(product)
+            photo = prepare_product_photo(product)
+
+    if photo:
+        sent_message = await _send_product_photo(message_or_query, photo, caption, keyboard)
+        await _remember_photo_file_id(product, sent_message)
+        return
 
+    if isinstance(message_or_query, Message):
+        await message_or_query.answer(text=f"🖼 [Фото отсутствует]\n\n{caption}", reply_markup=keyboard)
+        return
+
+    success = await _try_edit_message(
+        message_or_query.message,
+        text=f"🖼 [Фото отсутствует]\n\n{caption}",
+        reply_markup=keyboard
+    )
+    if not success:
         await _try_delete_message(message_or_query.message)
-        await message_or_query.bot.send_photo(
+        await message_or_query.bot.send_message(
             chat_id=message_or_query.message.chat.id,
-            photo=photo,
-            caption=caption,
-            reply_markup=keyboard
-        )
-    else:
-        success = await _try_edit_message(
-            message_or_query.message,
             text=f"🖼 [Фото отсутствует]\n\n{caption}",
             reply_markup=keyboard
         )
-        if not success:
-            await _try_delete_message(message_or_query.message)
-            await message_or_query.bot.send_message(
-                chat_id=message_or_query.message.chat.id,
-                text=f"🖼 [Фото отсутствует]\n\n{caption}",
-                reply_markup=keyboard
-            )
 
 # создание клавиатуры для карточки товара
 def build_product_keyboard(product, product_count=1):
     builder = InlineKeyboardBuilder()
     if product_count > 1:
-        builder.button(text="❮", callback_data="prev_product")
-        builder.button(text="❯", callback_data="next_product")
+        builder.button(text="❮", callback_data=cb.PREV_PRODUCT.pack())
+        builder.button(text="❯", callback_data=cb.NEXT_PRODUCT.pack())
         builder.adjust(2)
     
     builder.row(
-        InlineKeyboardButton(text="Добавить в корзину", callback_data="add_to_cart_product"),
-        InlineKeyboardButton(text="Назад", callback_data=f"back_to_subcategory:{product.subcategory.id}")
+        InlineKeyboardButton(text="Добавить в корзину", callback_data=cb.ADD_TO_CART.pack()),
+        InlineKeyboardButton(text="Назад", callback_data=cb.BACK_TO_SUBCATEGORY.pack(product.subcategory_id))
     )
     return builder.as_markup()
 
-# создание клавиатуры для списка подкатегорий
-def build_subcategory_keyboard(subcats, add_back_button=True):
-    builder = InlineKeyboardBuilder()
-    builder.row_width = 2
-    for sub in subcats:
-        builder.button(text=sub.name, callback_data=f"subcategory:{sub.id}")
-    if add_back_button:
-        builder.button(text="Назад", callback_data="back_to_categories")
-    return builder.as_markup()
+# текст позиции товара; при больших подкатегориях точное число не считаем
+def _position_label(index, total):
+    if total > PRODUCT_COUNT_LIMIT:
+        if index is None:
+            return f"Более {PRODUCT_COUNT_LIMIT} товаров"
+        return f"{index + 1} из {PRODUCT_COUNT_LIMIT}+"
+    if index is None:
+        return None
+    return f"{index + 1} из {total}"
+
+# ограниченный подсчет товаров подкатегории
+async def _count_products(sub_id):
+    return await Product.objects.filter(subcategory_id=sub_id)[:PRODUCT_COUNT_LIMIT + 1].acount()
+
+# товары после ключа (created_at, id): older - более старые (дальше по списку), иначе более новые
+# условие на created_at без OR задает границу диапазона по product_sub_created_idx,
+# поэтому поиск соседа начинается сразу с нужного места индекса
+def _beyond_cursor(created_at, product_id, older=True):
+    if older:
+        return Q(created_at__lte=created_at) & (
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=product_id)
+        )
+    return Q(created_at__gte=created_at) & (
+        Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=product_id)
+    )
 
-# отображение товара по индексу в списке
-async def _display_product_at_index(message_or_query: Union[Message, CallbackQuery], state: FSMContext, product_index: int):
-    data = await state.get_data()
-    product_ids = data.get("products", [])
+# соседний товар по ключу (created_at, id) в порядке показа (новые сверху)
+# при выходе за край списка возвращается товар с противоположного конца
+async def _neighbour_product(sub_id, created_at, product_id, forward=True):
+    products = Product.objects.filter(subcategory_id=sub_id).select_related('subcategory')
+    ordering = ('-created_at', '-id') if forward else ('created_at', 'id')
+    after = _beyond_cursor(created_at, product_id, older=forward)
+
+    product = await products.filter(after).order_by(*ordering).afirst()
+    if product is not None:
+        return product, False
+    return await products.order_by(*ordering).afirst(), True
+
+# индекс соседнего товара; None, если позиция неизвестна (подкатегория больше лимита)
+def _neighbour_index(index, total, forward, wrapped):
+    if forward:
+        if wrapped:
+            return 0
+        return None if index is None else index + 1
+    if wrapped:
+        return total - 1 if total <= PRODUCT_COUNT_LIMIT else None
+    return None if index is None else index - 1
+
+# подготовленная карточка товара: данные, подпись и клавиатура
+@dataclass
+class ProductCard:
+    product: Product
+    index: Optional[int]
+    total: int
+    caption: str
+    keyboard: InlineKeyboardMarkup
+
+def build_product_card(product, index, total):
+    return ProductCard(
+        product=product,
+        index=index,
+        total=total,
+        caption=build_product_caption(product, _position_label(index, total)),
+        keyboard=build_product_keyboard(product, total),
+    )
 
-    if not product_ids or not (0 <= product_index < len(product_ids)):
-        if isinstance(message_or_query, CallbackQuery):
-            await message_or_query.answer("Товары не найдены или произошла ошибка.", show_alert=True)
-        else:
-            await message_or_query.answer("Товары не найдены или произошла ошибка.")
+# загрузка карточки соседнего товара
+async def _load_neighbour_card(sub_id, created_at, product_id, index, total, forward):
+    product, wrapped = await _neighbour_product(sub_id, created_at, product_id, forward=forward)
+    if product is None:
+        return None
+    return build_product_card(product, _neighbour_index(index, total, forward, wrapped), total)
+
+# фоновая подгрузка следующей карточки в направлении листания, пока пользователь смотрит текущую
+def _prefetch_neighbour(user_id, card, forward):
+    if card.total < 2:
+        neighbour_prefetch.discard(user_id)
         return
+    product = card.product
+    args = (product.subcategory_id, product.created_at, product.id, card.index, card.total)
+    neighbour_prefetch.schedule(
+        user_id, (product.id, card.index, card.total), forward,
+        lambda: _load_neighbour_card(*args, forward=forward),
+    )
 
-    current_product_id = product_ids[product_index]
-    product = await Product.objects.select_related('subcategory__category').aget(id=current_product_id)
+# отображение карточки товара и сохранение курсора навигации
+# forward - направление, в котором пользователь листает (для новой подкатегории - вперед)
+async def _display_product(message_or_query: Union[Message, CallbackQuery], state: FSMContext, card, forward=True):
+    product = card.product
     await state.update_data(
-        index=product_index, 
-        current_product_id=current_product_id,
-        category_id=product.subcategory.category_id
+        index=card.index,
+        total=card.total,
+        current_product_id=product.id,
+        current_subcategory_id=product.subcategory_id,
+        cursor_created_at=product.created_at.isoformat()
     )
 
-    keyboard = build_product_keyboard(product, len(product_ids))
-    await _send_product_message(message_or_query, product, keyboard, is_edit=True)
+    _prefetch_neighbour(message_or_query.from_user.id, card, forward)
+    await _send_product_message(message_or_query, product, card.keyboard, caption=card.caption)
 
-# начало навигации по каталогу
-@router.message(F.text == "Каталог")
-async def show_categories(message: Message):
-    categories = [cat async for cat in Category.objects.all()]
-    if not categories:
-        await message.answer("Категорий пока нет.")
-        return
-
-    builder = InlineKeyboardBuilder()
-    builder.row_width = 2
-    for cat in categories:
-        builder.button(text=cat.name, callback_data=f"category:{cat.id}")
-
-    keyboard = builder.as_markup(resize_keyboard=True)
-    await message.answer("Выберите категорию:", reply_markup=keyboard)
-
-# выбор подкатегории в каталоге
-@router.callback_query(F.data.startswith("category:"))
-async def choose_subcategory(query: CallbackQuery):
-    category_id = int(query.data.split(":", 1)[1])
-    subcats = [sub async for sub in Subcategory.objects.filter(category_id=category_id)]
-    if not subcats:
-        await query.answer("Подкатегорий пока нет.", show_alert=True)
+# переход к соседнему товару относительно текущего курсора
+# карточка берется из предзагрузки, если она готовилась для этого же товара
+async def _step_product(query: CallbackQuery, state: FSMContext, forward):
+    data = await state.get_data()
+    sub_id = data.get("current_subcategory_id")
+    product_id = data.get("current_product_id")
+    cursor = data.get("cursor_created_at")
+    if not sub_id or not product_id or not cursor:
+        await query.answer("Ошибка: список товаров не найден.", show_alert=True)
         return
 
-    keyboard = build_subcategory_keyboard(subcats)
-    await query.message.edit_text("Выберите подкатегорию:", reply_markup=keyboard)
-    await query.answer()
-
-# возврат к списку категорий
-@router.callback_query(F.data == "back_to_categories")
-async def back_to_categories_from_subcat_list(query: CallbackQuery, state: FSMContext):
-    await state.set_data({}) 
-    categories = [cat async for cat in Category.objects.all()]
-    if not categories:
-        await query.answer("Категорий пока нет.", show_alert=True)
+    index = data.get("index")
+    total = data.get("total", 0)
+    card = await neighbour_prefetch.take(query.from_user.id, (product_id, index, total), forward)
+    if card is None:
+        card = await _load_neighbour_card(
+            sub_id, datetime.fromisoformat(cursor), product_id, index, total, forward
+        )
+    if card is None:
+        await query.answer("Товары не найдены или произошла ошибка.", show_alert=True)
         return
 
-    builder = InlineKeyboardBuilder()
-    builder.row_width = 2
-    for cat in categories:
-        builder.button(text=cat.name, callback_data=f"category:{cat.id}")
-
-    keyboard = builder.as_markup()
-    await query.message.edit_text("Выберите категорию:", reply_markup=keyboard)
-    await query.answer()
+    await _display_product(query, state, card, forward)
+    return query.answer()
 
 # показ первого товара в выбранной подкатегории
-@router.callback_query(F.data.startswith("subcategory:"))
-async def show_first_product_in_subcategory(query: CallbackQuery, state: FSMContext):
-    sub_id = int(query.data.split(":", 1)[1])
-    subcategory = await Subcategory.objects.select_related('category').aget(id=sub_id)
-    products_queryset = Product.objects.filter(subcategory_id=sub_id).select_related('subcategory__category')
-    product_list = [p async for p in products_queryset]
-
-    if not product_list:
+@callbacks.handler(cb.SUBCATEGORY)
+async def show_first_product_in_subcategory(query: CallbackQuery, state: FSMContext, sub_id: int):
+    subcategory = await catalog_cache.subcategory(sub_id)
+    if subcategory is None:
+        await query.answer("Подкатегория не найдена.", show_alert=True)
+        return
+
+    product = await Product.objects.filter(subcategory_id=sub_id).select_related('subcategory').order_by('-created_at', '-id').afirst()
+    if product is None:
         await query.answer("В этой подкатегории пока нет товаров.", show_alert=True)
         return
 
-    product_ids = [p.id for p in product_list]
-    await state.update_data(
-        products=product_ids, 
-        index=0, 
-        current_subcategory_id=sub_id,
-        category_id=subcategory.category_id
-    )
-    
-    await _display_product_at_index(query, state, 0)
+    total = await _count_products(sub_id)
+    await _display_product(query, state, build_product_card(product, 0, total))
+    return query.answer()
 
 # переход к следующему товару
-@router.callback_query(F.data == "next_product")
+@callbacks.handler(cb.NEXT_PRODUCT)
 async def handle_next_product(query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    product_ids = data.get("products", [])
-    if not product_ids:
-        await query.answer("Ошибка: список товаров не найден.", show_alert=True)
-        return 
-    current_index = data.get("index", 0)
-    new_index = (current_index + 1) % len(product_ids)
-    await _display_product_at_index(query, state, new_index)
+    return await _step_product(query, state, forward=True)
 
 # переход к предыдущему товару
-@router.callback_query(F.data == "prev_product")
+@callbacks.handler(cb.PREV_PRODUCT)
 async def handle_prev_product(query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    product_ids = data.get("products", [])
-    if not product_ids:
-        await query.answer("Ошибка: список товаров не найден.", show_alert=True)
-        return
-    current_index = data.get("index", 0)
-    new_index = (current_index - 1 + len(product_ids)) % len(product_ids)
-    await _display_product_at_index(query, state, new_index)
+    return await _step_product(query, state, forward=False)
+
+# открытие карточки конкретного товара (из поиска) с навигацией по его подкатегории
+async def open_product(message_or_query: Union[Message, CallbackQuery], state: FSMContext, product_id):
+    product = await Product.objects.select_related('subcategory').filter(id=product_id).afirst()
+    if product is None:
+        if isinstance(message_or_query, CallbackQuery):
+            await message_or_query.answer("Товар не найден.", show_alert=True)
+        else:
+            await message_or_query.answer("Товар не найден.")
+        return False
+
+    total = await _count_products(product.subcategory_id)
+    newer = _beyond_cursor(product.created_at, product.id, older=False)
+    index = await Product.objects.filter(newer, subcategory_id=product.subcategory_id)[:PRODUCT_COUNT_LIMIT].acount()
+    if index >= PRODUCT_COUNT_LIMIT:
+        index = None
+    await _display_product(message_or_query, state, build_product_card(product, index, total))
+    return True
+
+# показ товара по кнопке из результатов поиска
+@callbacks.handler(cb.SHOW_PRODUCT)
+async def show_product(query: CallbackQuery, state: FSMContext, product_id: int):
+    if await open_product(query, state, product_id):
+        return query.answer()
 
 # начало процесса добавления товара в корзину
-@router.callback_query(F.data == "add_to_cart_product")
+@callbacks.handler(cb.ADD_TO_CART)
 async def add_to_cart_callback(query: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     current_product_id = data.get("current_product_id")
@@ -238,7 +362,7 @@ async def add_to_cart_callback(query: CallbackQuery, state: FSMContext):
         reply_markup=ReplyKeyboardRemove()
     )
     await state.set_state(ProductStates.waiting_for_quantity)
-    await query.answer()
+    return query.answer()
 
 # обработка введенного количества товара
 @router.message(ProductStates.waiting_for_quantity)
@@ -251,16 +375,16 @@ async def process_quantity(message: Message, state: FSMContext):
     await state.update_data(quantity=quantity)
 
     builder = InlineKeyboardBuilder()
-    builder.button(text="✔️", callback_data="confirm_add")
-    builder.button(text="❌", callback_data="cancel_add")
+    builder.button(text="✔️", callback_data=cb.CONFIRM_ADD.pack())
+    builder.button(text="❌", callback_data=cb.CANCEL_ADD.pack())
     keyboard = builder.as_markup()
 
     await message.answer(f"Добавить {quantity} шт. в корзину?", reply_markup=keyboard)
     await state.set_state(ProductStates.waiting_for_confirmation)
 
 # подтверждение добавления товара в корзину
-@router.callback_query(F.data == "confirm_add")
-async def confirm_add(query: CallbackQuery, state: FSMContext):
+@callbacks.handler(cb.CONFIRM_ADD)
+async def confirm_add(query: CallbackQuery, state: FSMContext, user_obj: TelegramUser):
     data = await state.get_data()
     prod_id = data.get("current_product_id") 
     quantity = data.get("quantity", 0)
@@ -270,49 +394,43 @@ async def confirm_add(query: CallbackQuery, state: FSMContext):
         await state.set_state(None)
         return
 
-    user_obj, _ = await TelegramUser.objects.aget_or_create(telegram_id=query.from_user.id)
-    product = await Product.objects.aget(id=prod_id)
-
-    await CartItem.objects.aupdate_or_create(
-        user=user_obj,
-        product=product,
-        defaults={"quantity": quantity}
-    )
+    # один запрос: новая позиция или прибавка к уже лежащему в корзине количеству
+    try:
+        total = await add_to_cart(user_obj.id, prod_id, quantity)
+    except IntegrityError:
+        await query.message.edit_text("Этот товар больше недоступен.")
+        await state.clear()
+        return query.answer()
 
     builder = InlineKeyboardBuilder()
-    builder.button(text="Перейти в корзину", callback_data="view_cart")
-    builder.button(text="В каталог", callback_data="back_to_categories")
+    builder.button(text="Перейти в корзину", callback_data=cb.VIEW_CART.pack())
+    builder.button(text="В каталог", callback_data=cb.BACK_TO_CATEGORIES.pack())
     keyboard = builder.as_markup()
 
-    await query.message.answer("Товар добавлен в корзину.", reply_markup=keyboard)
+    await query.message.answer(f"Товар добавлен в корзину. В корзине: {total} шт.", reply_markup=keyboard)
     await state.clear()
-    await query.answer()
+    return query.answer()
 
 # отмена добавления товара в корзину
-@router.callback_query(F.data == "cancel_add")
+@callbacks.handler(cb.CANCEL_ADD)
 async def cancel_add(query: CallbackQuery, state: FSMContext):
     await state.clear()
     await query.message.answer(
         "Добавление в корзину отменено. Если хотите выбрать другой товар, нажмите 'Каталог'."
     )
-    await query.answer()
-
-# возврат к списку подкатегорий
-@router.callback_query(F.data.startswith("back_to_subcategory:"))
-async def back_to_subcategory(query: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    category_id = data.get("category_id")
-    if not category_id:
-        await back_to_categories_from_subcat_list(query, state)
-        return
-
-    subcats = [sub async for sub in Subcategory.objects.filter(category_id=category_id)]
-    if not subcats:
-        await query.answer("Подкатегорий пока нет.", show_alert=True)
-        return
+    return query.answer()
+
+# возврат к списку подкатегорий из карточки товара (сообщение с фото редактировать текстом нельзя)
+@callbacks.handler(cb.BACK_TO_SUBCATEGORY)
+async def back_to_subcategory(query: CallbackQuery, sub_id: int):
+    subcategory = await catalog_cache.subcategory(sub_id)
+    subcats = await catalog_cache.subcategories(subcategory.category_id) if subcategory else []
+    if subcats:
+        text, keyboard = "Выберите подкатегорию:", build_subcategory_keyboard(subcats)
+    else:
+        text, keyboard = "Выберите категорию:", build_categories_keyboard(await catalog_cache.categories())
 
-    keyboard = build_subcategory_keyboard(subcats)
-    if not await _try_edit_message(query.message, text="Выберите подкатегорию:", reply_markup=keyboard):
+    if not await _try_edit_message(query.message, text=text, reply_markup=keyboard):
         await _try_delete_message(query.message)
-        await query.message.answer("Выберите подкатегорию:", reply_markup=keyboard)
-    await query.answer()
+        await query.message.answer(text, reply_markup=keyboard)
+    return query.answer()
@@ -0,0 +1,144 @@
+from aiogram import Router, html
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.types import (
+    Message, CallbackQuery, InlineQuery, InlineKeyboardButton,
+    InlineQueryResultArticle, InlineQueryResultCachedPhoto, InputTextMessageContent
+)
+from aiogram.utils.deep_linking import create_start_link
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from bot.search import search_products
+from tg_bot import callbacks as cb
+from tg_bot.callbacks import callbacks
+from tg_bot.handlers.faq import faq_database
+from tg_bot.handlers.product import build_product_caption, cached_photo_file_id
+
+router = Router()
+
+# размер страницы результатов в inline-режиме и в чате
+INLINE_PAGE_SIZE = 20
+CHAT_PAGE_SIZE = 5
+
+
+# укороченное описание товара для списка результатов
+def _short_description(product, limit=80):
+    text = " ".join(product.description.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+# запросы, не совпадающие с темами FAQ, ищем по товарам
+def _is_product_query(inline_query: InlineQuery):
+    text = inline_query.query.strip().lower()
+    return bool(text) and not any(keyword.startswith(text) for keyword in faq_database)
+
+
+# inline-поиск товаров с постраничной подгрузкой через next_offset
+@router.inline_query(_is_product_query)
+async def product_inline_search(inline_query: InlineQuery):
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    products, has_more = await search_products(inline_query.query, offset, INLINE_PAGE_SIZE)
+
+    results = []
+    for product in products:
+        caption = build_product_caption(product)
+        builder = InlineKeyboardBuilder()
+        builder.button(text="Открыть в боте", url=await create_start_link(inline_query.bot, f"product_{product.id}"))
+        file_id = cached_photo_file_id(product)
+        if file_id:
+            results.append(InlineQueryResultCachedPhoto(
+                id=f"product_{product.id}",
+                photo_file_id=file_id,
+                title=product.subcategory.name,
+                description=_short_description(product),
+                caption=caption,
+                parse_mode="HTML",
+                reply_markup=builder.as_markup()
+            ))
+        else:
+            results.append(InlineQueryResultArticle(
+                id=f"product_{product.id}",
+                title=product.subcategory.name,
+                description=_short_description(product),
+                input_message_content=InputTextMessageContent(
+                    message_text=caption,
+                    parse_mode="HTML"
+                ),
+                reply_markup=builder.as_markup()
+            ))
+
+    if not results and offset == 0:
+        results.append(InlineQueryResultArticle(
+            id="not_found",
+            title="Ничего не найдено",
+            description="Попробуйте изменить запрос",
+            input_message_content=InputTextMessageContent(
+                message_text=f"По запросу «{html.quote(inline_query.query)}» ничего не найдено.",
+                parse_mode="HTML"
+            )
+        ))
+
+    await inline_query.answer(
+        results,
+        cache_time=60,
+        next_offset=str(offset + INLINE_PAGE_SIZE) if has_more else ""
+    )
+
+
+# страница результатов поиска в чате
+async def _render_search_page(text, offset):
+    products, has_more = await search_products(text, offset, CHAT_PAGE_SIZE)
+    if not products:
+        return None, None
+
+    lines = [f"🔍 Результаты по запросу «{html.quote(text)}»:\n"]
+    builder = InlineKeyboardBuilder()
+    for idx, product in enumerate(products, offset + 1):
+        lines.append(
+            f"{idx}. <b>{html.quote(product.subcategory.name)}</b> — {html.quote(_short_description(product))}"
+        )
+        builder.button(text=str(idx), callback_data=cb.SHOW_PRODUCT.pack(product.id))
+    builder.adjust(CHAT_PAGE_SIZE)
+
+    navigation = []
+    if offset > 0:
+        navigation.append(InlineKeyboardButton(text="❮", callback_data=cb.SEARCH_PAGE.pack(max(offset - CHAT_PAGE_SIZE, 0))))
+    if has_more:
+        navigation.append(InlineKeyboardButton(text="❯", callback_data=cb.SEARCH_PAGE.pack(offset + CHAT_PAGE_SIZE)))
+    if navigation:
+        builder.row(*navigation)
+    return "\n".join(lines), builder.as_markup()
+
+
+# поиск товаров командой /search <запрос>
+@router.message(Command("search"))
+async def search_command(message: Message, command: CommandObject, state: FSMContext):
+    if not command.args:
+        await message.answer("Введите запрос после команды, например: /search чехол")
+        return
+
+    text, keyboard = await _render_search_page(command.args, 0)
+    if text is None:
+        await message.answer("Ничего не найдено. Попробуйте изменить запрос.")
+        return
+
+    await state.update_data(search_query=command.args)
+    await message.answer(text, reply_markup=keyboard)
+
+
+# листание результатов поиска
+@callbacks.handler(cb.SEARCH_PAGE)
+async def search_page(query: CallbackQuery, state: FSMContext, offset: int):
+    data = await state.get_data()
+    search_query = data.get("search_query")
+    if not search_query:
+        await query.answer("Поиск устарел, повторите запрос.", show_alert=True)
+        return
+
+    text, keyboard = await _render_search_page(search_query, offset)
+    if text is None:
+        await query.answer("Больше ничего не найдено.", show_alert=True)
+        return
+
+    await query.message.edit_text(text, reply_markup=keyboard)
+    return query.answer()
@@ -1,35 +1,48 @@
-from aiogram import Router
-from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.filters import Command
+from aiogram import Router, F
+from aiogram.enums import ChatMemberStatus, ChatType
+from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, ChatMemberUpdated
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from bot.models import TelegramUser, CartItem
+from bot.services.users import amark_user_active, amark_users_unreachable
+from tg_bot import callbacks as cb
+from tg_bot.handlers.product import open_product
 
 router = Router()
 
 @router.message(Command(commands=["start"]))
-async def start_handler(message: Message):
+async def start_handler(message: Message, command: CommandObject, state: FSMContext, user_obj: TelegramUser, user_created: bool):
     user = message.from_user
-    obj, created = await TelegramUser.objects.aget_or_create(
-        telegram_id=user.id,
-        defaults={
-            'username': user.username or "",
-            'first_name': user.first_name or "",
-        }
-    )
-
-    if created:
+
+    # переход по ссылке на товар из inline-поиска
+    if command.args and command.args.startswith("product_") and command.args[8:].isdigit():
+        await open_product(message, state, int(command.args[8:]))
+        return
+
+    if user_created:
         text = f"👋 Привет, {user.first_name}! Вы успешно зарегистрированы."
     else:
         text = f"🔄 С возвращением, {user.first_name}! Вы уже зарегистрированы."
 
     builder = InlineKeyboardBuilder()
-    builder.button(text="Каталог", callback_data="show_catalog")
-    builder.button(text="FAQ", callback_data="show_faq")
+    builder.button(text="Каталог", callback_data=cb.SHOW_CATALOG.pack())
+    builder.button(text="FAQ", callback_data=cb.SHOW_FAQ.pack())
     builder.adjust(2)
+    builder.row(InlineKeyboardButton(text="🔍 Поиск", switch_inline_query_current_chat=""))
 
-    has_cart_items = await CartItem.objects.filter(user=obj).aexists()
+    has_cart_items = await CartItem.objects.filter(user=user_obj).aexists()
     if has_cart_items:
-        builder.row(InlineKeyboardButton(text="Корзина", callback_data="view_cart"))
+        builder.row(InlineKeyboardButton(text="Корзина", callback_data=cb.VIEW_CART.pack()))
 
     keyboard = builder.as_markup()
     await message.answer(text, reply_markup=keyboard)
+
+
+# пользователь заблокировал или снова запустил бота
+@router.my_chat_member(F.chat.type == ChatType.PRIVATE)
+async def track_bot_blocking(event: ChatMemberUpdated):
+    if event.new_chat_member.status == ChatMemberStatus.KICKED:
+        await amark_users_unreachable({event.from_user.id: TelegramUser.BLOCKED})
+    else:
+        await amark_user_active(event.from_user.id)
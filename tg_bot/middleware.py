@@ -1,7 +1,17 @@
 from typing import Any, Awaitable, Callable, Dict
-from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, CallbackQuery
+from collections import Counter, OrderedDict
+import asyncio
 import logging
+import time
+
+from bot.models import TelegramUser
+from bot.services.users import amark_user_active, amark_users_unreachable, unreachable_status
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,3 +30,162 @@ class LoggingMiddleware(BaseMiddleware):
         except Exception as e:
             logger.error(f"Ошибка при обработке события: {e}")
             raise
+
+
+# мидлварь, которая один раз за событие находит пользователя в базе
+# и передает его обработчикам как user_obj (и признак регистрации как user_created)
+# пользователи кэшируются в ограниченном LRU с TTL, одновременные промахи по одному
+# пользователю объединяются в один запрос
+# недоступным пользователя может отметить другой процесс (рассылки), поэтому и при попадании в кэш
+# не реже раза в reactivate_interval пользователь, который пишет боту, снова отмечается доступным
+class UserMiddleware(BaseMiddleware):
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0, reactivate_interval: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.reactivate_interval = reactivate_interval
+        self._cache = OrderedDict()
+        self._pending = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user = data.get("event_from_user")
+        if from_user is not None:
+            data["user_obj"], data["user_created"] = await self.resolve(from_user)
+        return await handler(event, data)
+
+    async def resolve(self, from_user):
+        entry = self._cache.get(from_user.id)
+        if entry is not None:
+            expires, reactivate_at, user_obj = entry
+            now = time.monotonic()
+            if expires > now:
+                self._cache.move_to_end(from_user.id)
+                if reactivate_at <= now:
+                    self._cache[from_user.id] = (expires, now + self.reactivate_interval, user_obj)
+                    await amark_user_active(from_user.id)
+                return user_obj, False
+            del self._cache[from_user.id]
+
+        # признак регистрации получает только событие, начавшее загрузку, чтобы приветствие не повторялось
+        task = self._pending.get(from_user.id)
+        started = task is None
+        if started:
+            task = asyncio.ensure_future(self._load(from_user))
+            self._pending[from_user.id] = task
+            task.add_done_callback(lambda _: self._pending.pop(from_user.id, None))
+        user_obj, created = await asyncio.shield(task)
+        return user_obj, created and started
+
+    async def _load(self, from_user):
+        user_obj, created = await TelegramUser.objects.aget_or_create(
+            telegram_id=from_user.id,
+            defaults={
+                'username': from_user.username or "",
+                'first_name': from_user.first_name or "",
+            }
+        )
+        # пользователь снова пишет боту - значит, сообщения ему доставляются
+        if user_obj.delivery_status != TelegramUser.ACTIVE:
+            await amark_user_active(from_user.id)
+            user_obj.delivery_status = TelegramUser.ACTIVE
+            user_obj.unreachable_since = None
+        now = time.monotonic()
+        self._cache[from_user.id] = (now + self.ttl, now + self.reactivate_interval, user_obj)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return user_obj, created
+
+    def forget(self, telegram_id):
+        self._cache.pop(telegram_id, None)
+
+
+# мидлварь ограничения частоты: token bucket на каждого пользователя
+# и отбрасывание повторных нажатий на кнопки сообщения, пока предыдущее еще обрабатывается
+# счетчики отброшенных событий доступны в stats
+class ThrottlingMiddleware(BaseMiddleware):
+    def __init__(self, rate: float = 3.0, burst: int = 6, max_users: int = 50000):
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        self._buckets = OrderedDict()
+        self._in_flight = set()
+        self.stats = Counter()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user = data.get("event_from_user")
+        if from_user is None:
+            return await handler(event, data)
+
+        is_callback = isinstance(event, CallbackQuery)
+        flight_key = None
+        if is_callback and event.message is not None:
+            flight_key = (event.message.chat.id, event.message.message_id)
+            if flight_key in self._in_flight:
+                self.stats["duplicate_callbacks"] += 1
+                return event.answer()
+
+        if not self._take_token(from_user.id):
+            if is_callback:
+                self.stats["throttled_callbacks"] += 1
+                return event.answer("Слишком часто, подождите немного.")
+            self.stats["throttled_messages"] += 1
+            return None
+
+        if flight_key is None:
+            return await handler(event, data)
+        self._in_flight.add(flight_key)
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_flight.discard(flight_key)
+
+    def _take_token(self, user_id) -> bool:
+        now = time.monotonic()
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = [float(self.burst), now]
+            self._buckets[user_id] = bucket
+            if len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+            tokens, last = bucket
+            bucket[0] = min(float(self.burst), tokens + (now - last) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] < 1.0:
+            return False
+        bucket[0] -= 1.0
+        return True
+
+
+# мидлварь сессии бота: если Telegram ответил, что пользователь заблокировал бота или чата нет,
+# пользователь помечается недоступным и больше не попадает в рассылки
+class DeliverabilityMiddleware(BaseRequestMiddleware):
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ):
+        try:
+            return await make_request(bot, method)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            chat_id = getattr(method, 'chat_id', None)
+            status = unreachable_status(e)
+            # личные чаты имеют положительный id, совпадающий с id пользователя
+            if status is not None and isinstance(chat_id, int) and chat_id > 0:
+                try:
+                    await amark_users_unreachable({chat_id: status})
+                except Exception as db_error:
+                    logger.error(f"Не удалось отметить пользователя {chat_id} недоступным: {db_error}")
+            raise
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+# фоновая подгрузка соседней карточки для каждого пользователя
+# готовится только карточка в направлении, в котором пользователь листает, и только для последней показанной;
+# старые пользователи вытесняются
+class NeighbourPrefetch:
+    def __init__(self, max_users: int = 5000, ttl: float = 60.0):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def schedule(self, user_id, anchor, direction, loader):
+        entry = self._entries.get(user_id)
+        self.discard(user_id)
+        # пользователь листает быстрее, чем готовятся карточки: запросы ORM выполняются в одном потоке,
+        # поэтому новая подгрузка не ставится в очередь перед запросами обработчиков
+        if entry is not None and not entry[3].done():
+            return
+
+        task = asyncio.create_task(loader())
+        task.add_done_callback(_consume_exception)
+        self._entries[user_id] = (anchor, direction, time.monotonic(), task)
+
+        while len(self._entries) > self.max_users:
+            self.discard(next(iter(self._entries)))
+
+    # результат подгрузки или None, если карточка не готовилась или устарела
+    async def take(self, user_id, anchor, direction):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        entry_anchor, entry_direction, created, task = entry
+        if entry_anchor != anchor or entry_direction != direction or time.monotonic() - created > self.ttl:
+            return None
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.cancelled():
+                return None
+            raise
+        except Exception:
+            return None
+
+    def discard(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            entry[3].cancel()
+
+
+def _consume_exception(task):
+    if not task.cancelled():
+        task.exception()
+
+
+neighbour_prefetch = NeighbourPrefetch()
@@ -0,0 +1,42 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+
+# кэш готовых отчетов: file_id отправленного документа хранится, пока не изменились заказы (версия) и не истек ttl
+# одинаковые запросы, пришедшие во время построения, ждут одно и то же вычисление
+class ReportCache:
+    def __init__(self, ttl: float = 300.0, maxsize: int = 100):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = {}
+        self._pending = {}
+
+    # (file_id, число строк) или None; file_id None означает пустой отчет
+    def get(self, key, version) -> Optional[tuple]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry_version, expires, file_id, count = entry
+        if entry_version != version or expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        return file_id, count
+
+    def remember(self, key, version, file_id, count):
+        self._entries[key] = (version, time.monotonic() + self.ttl, file_id, count)
+        while len(self._entries) > self.maxsize:
+            del self._entries[next(iter(self._entries))]
+
+    # одно вычисление на ключ: повторные вызовы до его завершения получают тот же результат
+    async def single_flight(self, key, factory):
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+
+report_cache = ReportCache(ttl=float(os.getenv('REPORT_CACHE_TTL', '300')))
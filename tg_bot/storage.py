@@ -0,0 +1,105 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import timedelta
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.utils import timezone
+
+from bot.models import FSMRecord
+
+logger = logging.getLogger(__name__)
+
+_FSM = FSMRecord._meta.db_table
+_UPSERT_TEMPLATE = f"""
+    INSERT INTO {_FSM} (key, state, data, updated_at) VALUES (%s, %s, %s::jsonb, %s)
+    ON CONFLICT (key) DO UPDATE SET
+        {{field}} = EXCLUDED.{{field}},
+        {{other}} = CASE WHEN {_FSM}.updated_at < %s THEN EXCLUDED.{{other}} ELSE {_FSM}.{{other}} END,
+        updated_at = EXCLUDED.updated_at
+"""
+_UPSERT_SQL = {
+    'state': _UPSERT_TEMPLATE.format(field='state', other='data'),
+    'data': _UPSERT_TEMPLATE.format(field='data', other='state'),
+}
+
+
+# хранилище FSM в postgres: состояние переживает перезапуск и доступно всем процессам бота
+# каждая запись обновляется одним INSERT ... ON CONFLICT DO UPDATE
+class PostgresStorage(BaseStorage):
+    def __init__(self, ttl: timedelta = timedelta(days=7)):
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        parts = [
+            key.bot_id,
+            key.chat_id,
+            key.user_id,
+            getattr(key, 'thread_id', None) or '',
+            getattr(key, 'business_connection_id', None) or '',
+            key.destiny,
+        ]
+        return ":".join(str(part) for part in parts)
+
+    def _alive(self):
+        return FSMRecord.objects.filter(updated_at__gte=timezone.now() - self.ttl)
+
+    # запись одного поля; второе поле устаревшей записи, которую cleanup еще не удалил, сбрасывается,
+    # иначе обновление updated_at вернуло бы его к жизни
+    def _upsert(self, key: StorageKey, field: str, state, data):
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(_UPSERT_SQL[field], [self._key(key), state, json.dumps(data), now, now - self.ttl])
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        if isinstance(state, State):
+            state = state.state
+        await sync_to_async(self._upsert)(key, 'state', state, {})
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self._alive().filter(key=self._key(key)).values_list('state', flat=True).afirst()
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await sync_to_async(self._upsert)(key, 'data', None, dict(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        data = await self._alive().filter(key=self._key(key)).values_list('data', flat=True).afirst()
+        return dict(data or {})
+
+    async def close(self) -> None:
+        pass
+
+    # удаление состояний, которые не менялись дольше ttl
+    async def cleanup(self) -> int:
+        deleted, _ = await FSMRecord.objects.filter(updated_at__lt=timezone.now() - self.ttl).adelete()
+        return deleted
+
+    async def run_cleanup(self, interval: float = 3600.0):
+        while True:
+            try:
+                deleted = await self.cleanup()
+                if deleted:
+                    logger.info(f"Удалено устаревших состояний FSM: {deleted}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка очистки состояний FSM: {e}")
+            await asyncio.sleep(interval)
+
+
+# выбор хранилища FSM по переменной окружения FSM_STORAGE (memory или postgres)
+def create_storage() -> BaseStorage:
+    kind = os.getenv('FSM_STORAGE', 'memory').lower()
+    if kind == 'postgres':
+        ttl_days = int(os.getenv('FSM_TTL_DAYS', '7'))
+        return PostgresStorage(ttl=timedelta(days=ttl_days))
+    if kind != 'memory':
+        raise RuntimeError(f"Неизвестное хранилище FSM: {kind}")
+    return MemoryStorage()
@@ -0,0 +1,170 @@
+import asyncio
+import hmac
+import json
+import logging
+import os
+from urllib.parse import urlencode
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+
+from bot.telegram import close_shared_bot
+
+logger = logging.getLogger(__name__)
+
+
+# прием обновлений Telegram через вебхук в виде ASGI-приложения
+# запускается отдельно (uvicorn) или монтируется рядом с Django в shop_test/asgi.py:
+# запросы на другие пути передаются в fallback-приложение
+class WebhookApp:
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        path: str = "/tg/webhook",
+        url: str = None,
+        secret_token: str = None,
+        max_concurrency: int = 100,
+        fallback=None,
+    ):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.path = path
+        self.url = url
+        self.secret_token = secret_token
+        self.max_concurrency = max_concurrency
+        self.fallback = fallback
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] == 'http' and scope['path'] == self.path:
+            await self._handle_update(scope, receive, send)
+            return
+        if self.fallback is not None:
+            await self.fallback(scope, receive, send)
+            return
+        await _respond(send, 404)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.error(f"Ошибка запуска вебхука: {e}")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def startup(self):
+        await self.dispatcher.emit_startup(bot=self.bot, dispatcher=self.dispatcher)
+        if self.url:
+            await self.bot.set_webhook(
+                url=self.url,
+                secret_token=self.secret_token,
+                max_connections=min(self.max_concurrency, 100),
+                allowed_updates=self.dispatcher.resolve_used_update_types(),
+            )
+
+    async def shutdown(self):
+        await self.dispatcher.emit_shutdown(bot=self.bot, dispatcher=self.dispatcher)
+        await close_shared_bot()
+
+    async def _handle_update(self, scope, receive, send):
+        if scope['method'] != 'POST':
+            await _respond(send, 405)
+            return
+        if self.secret_token:
+            headers = dict(scope['headers'])
+            received = headers.get(b'x-telegram-bot-api-secret-token', b'').decode('latin-1')
+            if not hmac.compare_digest(received, self.secret_token):
+                await _respond(send, 401)
+                return
+
+        body = await _read_body(receive)
+        try:
+            update = Update.model_validate(json.loads(body), context={"bot": self.bot})
+        except ValueError:
+            await _respond(send, 400)
+            return
+
+        # ограничиваем число одновременно обрабатываемых обновлений
+        async with self._semaphore:
+            result = await self.dispatcher.feed_webhook_update(self.bot, update)
+
+        payload = await self._method_payload(result)
+        if payload is None:
+            await _respond(send, 200)
+            return
+        await _respond(
+            send, 200,
+            body=urlencode(payload).encode(),
+            content_type=b'application/x-www-form-urlencoded'
+        )
+
+    # метод Telegram, который вернул обработчик, отправляем прямо в ответе на вебхук
+    # экономя отдельный исходящий запрос; с файлами так нельзя - вызываем их обычным запросом
+    async def _method_payload(self, result):
+        if not isinstance(result, TelegramMethod):
+            return None
+
+        files = {}
+        payload = {"method": result.__api_method__}
+        for key, value in result.model_dump(warnings=False).items():
+            value = self.bot.session.prepare_value(value, bot=self.bot, files=files)
+            if value is None:
+                continue
+            payload[key] = value if isinstance(value, str) else json.dumps(value)
+
+        if files:
+            try:
+                await self.bot(result)
+            except Exception as e:
+                logger.error(f"Ошибка выполнения метода {result.__api_method__}: {e}")
+            return None
+        return payload
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _respond(send, status, body=b'', content_type=b'text/plain'):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+# вебхук с настройками из окружения
+# WEBHOOK_URL - публичный адрес вебхука, WEBHOOK_PATH - путь приема,
+# WEBHOOK_SECRET - секрет для заголовка X-Telegram-Bot-Api-Secret-Token,
+# WEBHOOK_CONCURRENCY - максимум одновременно обрабатываемых обновлений
+def create_webhook_app(fallback=None) -> WebhookApp:
+    from tg_bot.app import create_bot, create_dispatcher
+
+    return WebhookApp(
+        dispatcher=create_dispatcher(),
+        bot=create_bot(),
+        path=os.getenv('WEBHOOK_PATH', '/tg/webhook'),
+        url=os.getenv('WEBHOOK_URL'),
+        secret_token=os.getenv('WEBHOOK_SECRET') or None,
+        max_concurrency=int(os.getenv('WEBHOOK_CONCURRENCY', '100')),
+        fallback=fallback,
+    )